@@ -0,0 +1,348 @@
+"""Export recordings as animated GIF or WebP.
+
+Frames are streamed from the video with cv2.VideoCapture, so memory use does
+not grow with the length of the clip. All frames share one palette, built
+from a sample of the clip with a vectorized median cut. GIF frames are
+cropped to the rectangle that changed since the previous frame, and pixels
+inside it that did not change are written as transparent, which keeps
+typical UI recordings small.
+
+Usage:
+    python animated_export.py recording.mp4 clip.gif [--fps 10] [--scale 0.5]
+"""
+import os
+import sys
+import struct
+import argparse
+import numpy as np
+from PIL import Image, GifImagePlugin
+from PyQt5.QtCore import QThread, pyqtSignal
+
+DEFAULT_FPS = 15
+PALETTE_COLORS = 255
+TRANSPARENT_INDEX = 255
+
+# Number of frames sampled to build the shared palette
+PALETTE_SAMPLES = 24
+
+
+def _rgb555(frame):
+    """Map RGB pixels to 15 bit color codes"""
+    frame = frame.astype(np.uint16)
+    return ((frame[..., 0] >> 3) << 10) | ((frame[..., 1] >> 3) << 5) | (frame[..., 2] >> 3)
+
+
+def probe(path):
+    """Return (fps, frame_count) of a video without decoding it"""
+    import cv2
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video {path}")
+    try:
+        return capture.get(cv2.CAP_PROP_FPS) or 30.0, int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        capture.release()
+
+
+def _read_frames(path, fps=None, scale=1.0):
+    """Yield (rgb_frame, duration_ms) from a video, dropping frames to reach fps"""
+    import cv2
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video {path}")
+    try:
+        source_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        fps = min(fps or source_fps, source_fps)
+        index = 0
+        emitted = 0
+        while capture.grab():
+            # Keep a frame whenever the output timeline reaches it
+            if int(index * fps / source_fps) >= emitted:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                if scale != 1.0:
+                    frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                emitted += 1
+                yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), 1000.0 / fps
+            index += 1
+    finally:
+        capture.release()
+
+
+def count_frames(path, fps=None):
+    """Number of frames _read_frames will produce"""
+    source_fps, total = probe(path)
+    if not total:
+        return 0
+    return int((total - 1) * min(fps or source_fps, source_fps) / source_fps) + 1
+
+
+class Palette:
+    """A shared palette plus a lookup table from 15 bit codes to palette indices"""
+
+    def __init__(self, colors, code_colors=None):
+        self.colors = np.asarray(colors, dtype=np.uint8)
+        self.lut = self._build_lut(code_colors)
+
+    def _build_lut(self, code_colors=None):
+        if code_colors is None:
+            code_colors = self.lut_colors()
+        code_colors = np.asarray(code_colors, dtype=np.float64)
+        colors = self.colors.astype(np.float64)
+        lut = np.empty(len(code_colors), dtype=np.uint8)
+        # Nearest palette entry for every code, in chunks to bound memory
+        for start in range(0, len(code_colors), 4096):
+            chunk = code_colors[start:start + 4096, None, :] - colors[None, :, :]
+            lut[start:start + 4096] = np.argmin((chunk * chunk).sum(axis=2), axis=1)
+        return lut
+
+    def quantize(self, frame):
+        """Map an RGB frame to palette indices"""
+        return self.lut[_rgb555(frame)]
+
+    def palette_bytes(self):
+        """768 bytes of RGB palette, padded to 256 entries"""
+        padded = np.zeros((256, 3), dtype=np.uint8)
+        padded[:len(self.colors)] = self.colors
+        return padded.tobytes()
+
+    @classmethod
+    def from_frames(cls, frames, max_colors=PALETTE_COLORS):
+        """Median cut over the color histogram of some frames"""
+        counts = np.zeros(1 << 15, dtype=np.float64)
+        sums = np.zeros((1 << 15, 3), dtype=np.float64)
+        for frame in frames:
+            # Subsample pixels, the histogram shape barely changes
+            pixels = frame[::2, ::2].reshape(-1, 3)
+            codes = _rgb555(pixels)
+            counts += np.bincount(codes, minlength=1 << 15)
+            for channel in range(3):
+                sums[:, channel] += np.bincount(codes, weights=pixels[:, channel], minlength=1 << 15)
+
+        used = np.flatnonzero(counts)
+        if not len(used):
+            return cls(np.zeros((1, 3), dtype=np.uint8))
+        weights = counts[used]
+        # Mean of the real colors in each bin keeps flat UI colors exact
+        means = sums[used] / weights[:, None]
+
+        def score(box):
+            # Widest color range, weighted by population
+            if len(box) < 2:
+                return -1
+            return np.ptp(means[box], axis=0).max() * np.sqrt(weights[box].sum())
+
+        boxes = [np.arange(len(used))]
+        scores = [score(boxes[0])]
+        while len(boxes) < max_colors:
+            best = int(np.argmax(scores))
+            if scores[best] <= 0:
+                break
+            box = boxes.pop(best)
+            scores.pop(best)
+            # Split at the weighted median of the widest channel
+            channel = int(np.argmax(np.ptp(means[box], axis=0)))
+            order = box[np.argsort(means[box, channel], kind="stable")]
+            cumulative = np.cumsum(weights[order])
+            split = int(np.searchsorted(cumulative, cumulative[-1] / 2))
+            split = min(max(split, 1), len(order) - 1)
+            for half in (order[:split], order[split:]):
+                boxes.append(half)
+                scores.append(score(half))
+
+        colors = np.clip(np.rint([np.average(means[box], axis=0, weights=weights[box]) for box in boxes]), 0, 255)
+        # Map populated codes from their real mean color, not the code center
+        code_colors = cls.lut_colors()
+        code_colors[used] = means
+        return cls(colors, code_colors)
+
+    @staticmethod
+    def lut_colors():
+        """Center color of every 15 bit code"""
+        codes = np.arange(1 << 15)
+        return np.stack([(codes >> 10) & 31, (codes >> 5) & 31, codes & 31], axis=1) * 8.0 + 4
+
+
+def build_palette(path, fps=None, scale=1.0, samples=PALETTE_SAMPLES):
+    """Build the shared palette from frames spread over the whole clip"""
+    total = count_frames(path, fps)
+    step = max(1, total // samples)
+    frames = (frame for i, (frame, _) in enumerate(_read_frames(path, fps, scale)) if i % step == 0)
+    return Palette.from_frames(frames)
+
+
+def _changed_box(previous, current):
+    """Bounding box (x0, y0, x1, y1) of the pixels that differ, or None"""
+    changed = previous != current
+    rows = np.flatnonzero(changed.any(axis=1))
+    if not len(rows):
+        return None
+    cols = np.flatnonzero(changed[rows[0]:rows[-1] + 1].any(axis=0))
+    return cols[0], rows[0], cols[-1] + 1, rows[-1] + 1
+
+
+def export_gif(source, target, fps=DEFAULT_FPS, scale=1.0, loop=0, progress=None):
+    """Stream a video into an animated GIF with a shared palette and cropped frames"""
+    palette = build_palette(source, fps, scale)
+    total = count_frames(source, fps)
+
+    frames = _read_frames(source, fps, scale)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError(f"No frames in {source}")
+    height, width = first[0].shape[:2]
+
+    with open(target, "wb") as fp:
+        # Header, logical screen with a 256 entry global color table
+        fp.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0xF7, 0, 0))
+        fp.write(palette.palette_bytes())
+        # Netscape extension for looping
+        fp.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loop) + b"\x00")
+
+        def write_frame(indices, box, duration, transparency):
+            x0, y0, x1, y1 = box
+            image = Image.frombytes("P", (x1 - x0, y1 - y0), np.ascontiguousarray(indices[y0:y1, x0:x1]).tobytes())
+            image.putpalette(palette.palette_bytes())
+            params = {"duration": max(20, int(round(duration))), "disposal": 1}
+            if transparency:
+                params["transparency"] = TRANSPARENT_INDEX
+            for chunk in GifImagePlugin.getdata(image, offset=(x0, y0), **params):
+                fp.write(chunk)
+
+        # Frames are written one behind, so unchanged frames can extend
+        # the duration of the frame before them
+        previous = palette.quantize(first[0])
+        pending = (previous, (0, 0, width, height), first[1], False)
+        written = 1
+        for frame, duration in frames:
+            current = palette.quantize(frame)
+            box = _changed_box(previous, current)
+            if box is None:
+                indices, pending_box, pending_duration, transparency = pending
+                pending = (indices, pending_box, pending_duration + duration, transparency)
+            else:
+                write_frame(*pending)
+                # Pixels that did not change show through from the previous frame
+                delta = np.where(previous == current, TRANSPARENT_INDEX, current).astype(np.uint8)
+                pending = (delta, box, duration, True)
+                previous = current
+            written += 1
+            if progress and total:
+                progress(min(99, written * 100 // total))
+        write_frame(*pending)
+        fp.write(b";")
+    if progress:
+        progress(100)
+
+
+class _FrameSequence(Image.Image):
+    """A multi-frame image whose frames are decoded lazily on seek()
+
+    Pillow's animated writers walk n_frames and seek() through each frame,
+    so this lets the WebP encoder consume a video one frame at a time.
+    """
+
+    def __init__(self, frames, n_frames, progress=None):
+        super().__init__()
+        self._frames = frames
+        self._position = 0
+        self._progress = progress
+        self.n_frames = n_frames
+        self.is_animated = n_frames > 1
+        self._show(next(self._frames))
+
+    def _show(self, frame):
+        image = Image.fromarray(frame)
+        self.im = image.im
+        self._mode = image.mode
+        self._size = image.size
+
+    def tell(self):
+        return self._position
+
+    def seek(self, frame):
+        # Only forward steps decode anything, the writer seeks back to
+        # the start once it is done
+        if frame == self._position + 1:
+            # The container frame count can be off by a few frames; holding
+            # the last frame is harmless since libwebp merges repeats
+            current = next(self._frames, None)
+            if current is not None:
+                self._show(current)
+            self._position = frame
+            if self._progress:
+                self._progress(min(99, frame * 100 // self.n_frames))
+
+
+def export_webp(source, target, fps=DEFAULT_FPS, scale=1.0, loop=0, lossless=True, progress=None):
+    """Stream a video into an animated WebP.
+
+    Frames are mapped to the shared palette, so lossless WebP can use its
+    color-indexing transform. libwebp crops every frame to the changed
+    sub-rectangle and merges identical frames by itself.
+    """
+    palette = build_palette(source, fps, scale)
+    total = count_frames(source, fps)
+    source_fps, _ = probe(source)
+
+    def frames():
+        for frame, _ in _read_frames(source, fps, scale):
+            yield palette.colors[palette.quantize(frame)]
+
+    # The duration of every frame is the same after resampling to fps
+    duration = 1000.0 / min(fps or source_fps, source_fps)
+    sequence = _FrameSequence(frames(), total, progress)
+    sequence.save(target, "WEBP", save_all=True, duration=int(round(duration)), loop=loop,
+                  lossless=lossless, quality=80 if not lossless else 100, method=2)
+    if progress:
+        progress(100)
+
+
+def export_animation(source, target, fps=DEFAULT_FPS, scale=1.0, progress=None):
+    """Export to GIF or WebP depending on the target extension"""
+    extension = os.path.splitext(target)[1].lower()
+    if extension == ".gif":
+        export_gif(source, target, fps, scale, progress=progress)
+    elif extension == ".webp":
+        export_webp(source, target, fps, scale, progress=progress)
+    else:
+        raise ValueError(f"Unsupported animation format: {extension}")
+
+
+class AnimatedExportWorker(QThread):
+    """Runs export_animation off the UI thread"""
+    progress = pyqtSignal(int)
+    finished_export = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, source, target, fps=DEFAULT_FPS, scale=1.0, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.target = target
+        self.fps = fps
+        self.scale = scale
+
+    def run(self):
+        try:
+            export_animation(self.source, self.target, self.fps, self.scale, self.progress.emit)
+            self.finished_export.emit(self.target)
+        except Exception as e:
+            print(f"Error exporting animation: {e}")
+            self.failed.emit(str(e))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a recording as animated GIF or WebP")
+    parser.add_argument("source")
+    parser.add_argument("target", help="Output file ending in .gif or .webp")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS)
+    parser.add_argument("--scale", type=float, default=1.0)
+    args = parser.parse_args(argv)
+    export_animation(args.source, args.target, args.fps, args.scale)
+    print(f"Wrote {args.target} ({os.path.getsize(args.target) / 1024:.0f} KiB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
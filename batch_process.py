@@ -0,0 +1,170 @@
+"""Batch post-processing of screenshot directories across all CPU cores.
+
+Every image is redacted, cropped and resized in that order, then written
+with the same encoder the editor uses. Redact and crop rectangles are given
+in pixels of the original screenshot as X,Y,WIDTH,HEIGHT:
+
+    python batch_process.py shots/ out/ --redact 0,0,1920,40 \\
+        --crop 0,40,1920,1040 --scale 0.5 --format webp --quality 80
+
+Outputs newer than their input are skipped, so re-running only processes
+new or changed screenshots.
+"""
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from image_utils import IMAGE_FORMATS, DEFAULT_PNG_COMPRESSION, save_image
+
+PROGRESS_INTERVAL = 2.0
+
+
+def parse_rect(value):
+    try:
+        x, y, width, height = (int(v) for v in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected X,Y,WIDTH,HEIGHT, got {value!r}")
+    return x, y, width, height
+
+
+def parse_size(value):
+    try:
+        width, height = (int(v) for v in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got {value!r}")
+    return width, height
+
+
+def process_image(source, target, redact=(), crop=None, size=None, scale=None, quality=None):
+    """Worker: load, transform and save one image, returns the output size in bytes"""
+    from PyQt5.QtCore import Qt, QRect
+    from PyQt5.QtGui import QImage, QPainter, QColor
+    image = QImage(source)
+    if image.isNull():
+        raise IOError(f"Could not read {source}")
+    if redact:
+        painter = QPainter(image)
+        for x, y, width, height in redact:
+            painter.fillRect(QRect(x, y, width, height), QColor("black"))
+        painter.end()
+    if crop:
+        image = image.copy(QRect(*crop))
+    if scale:
+        size = (max(1, round(image.width() * scale)), max(1, round(image.height() * scale)))
+    if size:
+        image = image.scaled(size[0], size[1], Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    # Write next to the target and rename, so an interrupted run leaves no partial files
+    partial = target + ".part" + os.path.splitext(target)[1]
+    if quality is None:
+        # Without a quality PNGs get the default zlib level, not the level quality 100 maps to
+        save_image(image, partial, compression=DEFAULT_PNG_COMPRESSION)
+    else:
+        save_image(image, partial, quality)
+    os.replace(partial, target)
+    return os.path.getsize(target)
+
+
+def iter_images(directory, recursive=False):
+    """Yield image paths under a directory without listing it all up front"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if recursive:
+                    yield from iter_images(entry.path, recursive)
+            elif os.path.splitext(entry.name)[1].lower() in IMAGE_FORMATS:
+                yield entry.path
+
+
+def output_path(source, input_dir, output_dir, image_format=None):
+    relative = os.path.relpath(source, input_dir)
+    if image_format:
+        relative = os.path.splitext(relative)[0] + "." + image_format
+    return os.path.join(output_dir, relative)
+
+
+def is_up_to_date(source, target):
+    try:
+        return os.path.getmtime(target) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def run_batch(input_dir, output_dir, options, workers=None, recursive=False, force=False):
+    """Process every image of input_dir into output_dir, returns a stats dict"""
+    workers = workers or os.cpu_count() or 1
+    stats = {"processed": 0, "skipped": 0, "failed": 0, "bytes": 0}
+    start = last_report = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep only a few tasks per worker in flight so huge directories stream through
+        pending = deque()
+
+        def collect(wait_for_all=False):
+            nonlocal last_report
+            while pending and (wait_for_all or len(pending) >= workers * 4 or pending[0][1].done()):
+                source, future = pending.popleft()
+                try:
+                    stats["bytes"] += future.result()
+                    stats["processed"] += 1
+                except Exception as e:
+                    print(f"Error processing {source}: {e}")
+                    stats["failed"] += 1
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                print(f"{stats['processed']} images, {stats['processed'] / (now - start):.1f} images/s")
+
+        for source in iter_images(input_dir, recursive):
+            target = output_path(source, input_dir, output_dir, options.get("image_format"))
+            if not force and is_up_to_date(source, target):
+                stats["skipped"] += 1
+                continue
+            kwargs = {key: value for key, value in options.items() if key != "image_format"}
+            pending.append((source, executor.submit(process_image, source, target, **kwargs)))
+            collect()
+        collect(wait_for_all=True)
+    stats["seconds"] = time.perf_counter() - start
+    stats["images_per_second"] = stats["processed"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crop, resize, redact and re-encode a folder of screenshots")
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--redact", type=parse_rect, action="append", default=[], metavar="X,Y,W,H",
+                        help="Black out a region, may be given more than once")
+    parser.add_argument("--crop", type=parse_rect, metavar="X,Y,W,H")
+    resize = parser.add_mutually_exclusive_group()
+    resize.add_argument("--resize", type=parse_size, metavar="WxH", help="Fit within this size")
+    resize.add_argument("--scale", type=float)
+    parser.add_argument("--format", choices=sorted({ext[1:] for ext in IMAGE_FORMATS}),
+                        help="Output format, defaults to the input format")
+    parser.add_argument("--quality", type=int,
+                        help="Encoder quality 0-100, defaults to 100 and to the default compression for PNG")
+    parser.add_argument("--workers", type=int, help="Worker processes, defaults to the CPU count")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--force", action="store_true", help="Also process up-to-date outputs")
+    args = parser.parse_args(argv)
+
+    if os.path.abspath(args.input_dir) == os.path.abspath(args.output_dir):
+        parser.error("The output directory must differ from the input directory")
+    options = {
+        "redact": args.redact,
+        "crop": args.crop,
+        "size": args.resize,
+        "scale": args.scale,
+        "quality": args.quality,
+        "image_format": args.format,
+    }
+    stats = run_batch(args.input_dir, args.output_dir, options, args.workers, args.recursive, args.force)
+    print(f"Processed {stats['processed']} images in {stats['seconds']:.1f}s "
+          f"({stats['images_per_second']:.1f} images/s, {stats['bytes'] / 1024 / 1024:.1f} MiB written), "
+          f"skipped {stats['skipped']} up to date, {stats['failed']} failed")
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,358 @@
+"""Performance benchmarks for the capture, record, edit and save paths.
+
+Every benchmark runs on synthetic frames, so no real desktop is needed.
+Without a display the script re-runs itself under ``xvfb-run`` when it is
+installed and falls back to Qt's offscreen platform otherwise.
+
+Usage:
+    python benchmark.py --output results.json
+    python benchmark.py --baseline baseline.json --tolerance 0.2 \\
+        --tolerance-for "export_png/*=0.4"
+
+With --baseline the exit code is 1 when any benchmark is slower than the
+baseline by more than its tolerance.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import fnmatch
+import argparse
+import platform
+import tempfile
+import statistics
+import numpy as np
+from frame_source import SyntheticFrameSource
+
+SIZES = {
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "8k": (7680, 4320),
+}
+
+DEFAULT_TOLERANCE = 0.15
+
+# Frames written per recorder run
+RECORD_FRAMES = 30
+
+
+def ensure_display():
+    """Make sure Qt has a platform to run on before QApplication is created"""
+    if sys.platform != "linux" or os.environ.get("DISPLAY") or os.environ.get("QT_QPA_PLATFORM"):
+        return
+    xvfb_run = shutil.which("xvfb-run")
+    if xvfb_run and not os.environ.get("BENCHMARK_UNDER_XVFB"):
+        os.environ["BENCHMARK_UNDER_XVFB"] = "1"
+        os.execv(xvfb_run, [xvfb_run, "-a", "-s", "-screen 0 1920x1080x24",
+                            sys.executable] + sys.argv)
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+
+
+def measure(func, repeat, warmup=1):
+    """Run func repeat times after warmup and return timing statistics in ms"""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": statistics.median(times),
+        "min_ms": min(times),
+        "max_ms": max(times),
+        "runs": repeat,
+    }
+
+
+def bench_convert(frame, repeat):
+    from screenshot_app import bgra_to_qimage
+    height, width = frame.shape[:2]
+    return measure(lambda: bgra_to_qimage(frame, (width, height)), repeat)
+
+
+def bench_record(source, repeat, workdir):
+    import cv2
+    from screenshot_app import bgra_to_bgr
+    width, height = source.size
+    # Pre-generate frames so only conversion and encoding are timed
+    frames = [source.grab() for _ in range(RECORD_FRAMES)]
+    path = os.path.join(workdir, "record.mp4")
+
+    def record():
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30.0, (width, height))
+        if not out.isOpened():
+            raise RuntimeError(f"VideoWriter cannot encode {width}x{height}")
+        for i in range(RECORD_FRAMES):
+            out.write(bgra_to_bgr(frames[i]))
+        out.release()
+
+    result = measure(record, repeat)
+    # Report per frame so different frame counts stay comparable
+    for key in ("median_ms", "min_ms", "max_ms"):
+        result[key] /= RECORD_FRAMES
+    result["fps"] = 1000 / result["median_ms"]
+    return result
+
+
+def recorded_frame_count(encoder, active, pause=0.0, fps=10.0):
+    """Record `active` seconds of synthetic frames with a pause in the middle, returns the frame count"""
+    import threading
+    import cv2
+    from PyQt5.QtCore import Qt
+    from screenshot_app import VideoRecorder
+    recorder = VideoRecorder(source_factory=lambda: SyntheticFrameSource(320, 240, change_rate=0.05),
+                             encoder=encoder, fps=fps, adaptive=False)
+    results = []
+    # No event loop runs here, so take the results straight from the recording thread
+    recorder.finished.connect(results.append, Qt.DirectConnection)
+    recorder.failed.connect(lambda error: results.append(RuntimeError(error)), Qt.DirectConnection)
+    thread = threading.Thread(target=recorder.run)
+    thread.start()
+    time.sleep(active / 2)
+    if pause:
+        recorder.pause()
+        time.sleep(pause)
+        recorder.resume()
+    time.sleep(active / 2)
+    recorder.stop()
+    thread.join()
+    if not results or isinstance(results[0], Exception):
+        raise RuntimeError(f"Recording failed: {results[0] if results else 'no result'}")
+    capture = cv2.VideoCapture(results[0])
+    count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    os.remove(results[0])
+    return count
+
+
+def check_recording_timing(encoders=("opencv", "spool"), active=3.0, pause=2.0, fps=10.0):
+    """Paused recordings must be as long as unpaused ones, returns a list of failures"""
+    failures = []
+    for encoder in encoders:
+        plain = recorded_frame_count(encoder, active, fps=fps)
+        paused = recorded_frame_count(encoder, active, pause, fps)
+        expected = active * fps
+        print(f"recording/{encoder:8s} {plain} frames, {paused} frames with a {pause:.0f}s pause "
+              f"(about {expected:.0f} expected)")
+        # A frame or two of slack for thread start-up and scheduling
+        if abs(paused - plain) > 2 or abs(plain - expected) > 3:
+            failures.append(encoder)
+    return failures
+
+
+def make_editor(frame):
+    from PyQt5.QtCore import QRectF, QPointF
+    from PyQt5.QtGui import QPen, QColor, QPainterPath
+    from editor import EditorWidget
+    from screenshot_app import bgra_to_qimage
+    height, width = frame.shape[:2]
+    editor = EditorWidget(bgra_to_qimage(frame, (width, height)))
+    # A realistic number of annotations
+    rng = np.random.default_rng(1)
+    pen = QPen(QColor('#FF0000'), 2)
+    for _ in range(25):
+        x, y = rng.integers(0, width - 200), rng.integers(0, height - 200)
+        editor.scene.addRect(QRectF(x, y, 180, 120), pen)
+        path = QPainterPath(QPointF(x, y))
+        path.lineTo(QPointF(x + 150, y + 90))
+        editor.scene.addPath(path, pen)
+        editor.scene.addText("Annotation").setPos(x, y)
+    return editor
+
+
+def bench_editor_open(frame, repeat, warm):
+    """Time from handing a capture to the editor until its first paint"""
+    from PyQt5.QtWidgets import QApplication
+    from editor import EditorDialog
+    from screenshot_app import bgra_to_qimage
+    app = QApplication.instance()
+    height, width = frame.shape[:2]
+    image = bgra_to_qimage(frame, (width, height))
+    shared = None
+    if warm:
+        shared = EditorDialog()
+        shared.prewarm()
+
+    def open_editor():
+        dialog = shared or EditorDialog()
+        dialog.reset(image, time.perf_counter())
+        dialog.show()
+        deadline = time.perf_counter() + 10
+        while dialog.open_latency_ms is None:
+            if time.perf_counter() > deadline:
+                raise RuntimeError("Editor was never painted")
+            app.processEvents()
+        dialog.hide()
+        if shared is None:
+            dialog.deleteLater()
+
+    try:
+        return measure(open_editor, repeat)
+    finally:
+        if shared is not None:
+            shared.deleteLater()
+
+
+def bench_render(editor, repeat):
+    return measure(editor.render_scene, repeat)
+
+
+def bench_export(editor, repeat, workdir, extension):
+    pixmap = editor.render_scene()
+    path = os.path.join(workdir, "export" + extension)
+    return measure(lambda: editor.export_image(pixmap, path), repeat)
+
+
+def bench_export_compressed(editor, repeat, workdir, parallel):
+    """A level 6 PNG export, through png_writer or through Qt"""
+    import image_utils
+    pixmap = editor.render_scene()
+    path = os.path.join(workdir, "export.png")
+    threshold = image_utils.PARALLEL_PNG_PIXELS
+    image_utils.PARALLEL_PNG_PIXELS = 0 if parallel else float("inf")
+    try:
+        return measure(lambda: image_utils.save_image(pixmap, path, compression=6), repeat)
+    finally:
+        image_utils.PARALLEL_PNG_PIXELS = threshold
+
+
+def run_benchmarks(sizes, repeat):
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in sizes:
+            width, height = SIZES[name]
+            # A typical UI clip: a few percent of the screen changes per frame
+            source = SyntheticFrameSource(width, height, change_rate=0.03)
+            frame = source.grab()
+            # Large frames are slow enough that fewer runs are still stable
+            runs = max(1, repeat // (width * height // (1920 * 1080)))
+            benchmarks = [
+                ("convert", lambda: bench_convert(frame, runs)),
+                ("record", lambda: bench_record(source, max(1, runs // 3), workdir)),
+            ]
+            editor = make_editor(frame)
+            benchmarks += [
+                ("editor_open_cold", lambda: bench_editor_open(frame, runs, warm=False)),
+                ("editor_open", lambda: bench_editor_open(frame, runs, warm=True)),
+                ("render", lambda: bench_render(editor, runs)),
+                ("export_png", lambda: bench_export(editor, runs, workdir, ".png")),
+                ("export_jpeg", lambda: bench_export(editor, runs, workdir, ".jpg")),
+                ("export_png6_qt", lambda: bench_export_compressed(editor, runs, workdir, False)),
+                ("export_png6_parallel", lambda: bench_export_compressed(editor, runs, workdir, True)),
+            ]
+            for bench_name, bench in benchmarks:
+                key = f"{bench_name}/{name}"
+                try:
+                    results[key] = bench()
+                    print(f"{key:24s} {results[key]['median_ms']:10.2f} ms")
+                except Exception as e:
+                    print(f"{key:24s}    skipped ({e})")
+            editor.deleteLater()
+            app.processEvents()
+    return results
+
+
+def environment():
+    import cv2
+    from PyQt5.QtCore import QT_VERSION_STR
+    from PyQt5.QtGui import QGuiApplication
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "qt": QT_VERSION_STR,
+        "qt_platform": QGuiApplication.platformName(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def parse_tolerances(values):
+    """Parse PATTERN=TOLERANCE overrides, e.g. 'record/*=0.3'"""
+    overrides = []
+    for value in values:
+        pattern, _, tolerance = value.rpartition("=")
+        if not pattern:
+            raise argparse.ArgumentTypeError(f"Expected PATTERN=TOLERANCE, got {value!r}")
+        overrides.append((pattern, float(tolerance)))
+    return overrides
+
+
+def compare(results, baseline, tolerance, overrides=()):
+    """Return (name, baseline_ms, current_ms, allowed) for every regression"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        allowed = tolerance
+        for pattern, value in overrides:
+            if fnmatch.fnmatch(name, pattern):
+                allowed = value
+        before = baseline[name]["median_ms"]
+        after = result["median_ms"]
+        if after > before * (1 + allowed):
+            regressions.append((name, before, after, allowed))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark capture, record, edit and save")
+    parser.add_argument("--sizes", default="1080p,4k,8k",
+                        help="Comma separated frame sizes (%s)" % ", ".join(SIZES))
+    parser.add_argument("--repeat", type=int, default=9, help="Runs per benchmark at 1080p")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous results file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--tolerance-for", action="append", default=[], metavar="PATTERN=TOLERANCE",
+                        help="Per-benchmark tolerance, may be given more than once")
+    parser.add_argument("--check-recording", action="store_true",
+                        help="Only check that recordings keep real time, also across a pause")
+    args = parser.parse_args(argv)
+
+    if args.check_recording:
+        ensure_display()
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication(sys.argv)
+        failures = check_recording_timing()
+        if failures:
+            print(f"Recording timing is off for: {', '.join(failures)}")
+            return 1
+        print("Recording timing OK")
+        return 0
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes: {', '.join(unknown)}")
+    overrides = parse_tolerances(args.tolerance_for)
+
+    ensure_display()
+    results = run_benchmarks(sizes, args.repeat)
+    report = {"environment": environment(), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance, overrides)
+        for name, before, after, allowed in regressions:
+            print(f"REGRESSION {name}: {before:.2f} ms -> {after:.2f} ms "
+                  f"(+{(after / before - 1) * 100:.0f}%, allowed {allowed * 100:.0f}%)")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
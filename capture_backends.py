@@ -0,0 +1,448 @@
+"""Screen capture backends and automatic selection of the fastest one.
+
+Every backend is a FrameSource returning BGRA frames of the same area, the
+monitor mss numbers 1 (see primary_monitor()):
+
+    mss    portable, works everywhere mss does
+    qt     QScreen.grabWindow, only usable on the GUI thread
+    xshm   X11 shared memory via ctypes; with XDamage an unchanged screen
+           skips the copy entirely and damaged rectangles are reported
+
+select_backend() benchmarks the available backends once per display
+configuration, caches the result in QSettings and returns the one with the
+lowest grab latency, unless a backend was chosen by hand:
+
+    python capture_backends.py            show the cached or fresh timings
+    python capture_backends.py --rebenchmark
+    python capture_backends.py --use xshm  override the automatic choice
+"""
+import os
+import sys
+import json
+import time
+import ctypes
+import ctypes.util
+import argparse
+import numpy as np
+from frame_source import FrameSource, MssFrameSource, FRAME_SOURCE_ENV
+
+BACKEND_AUTO = "auto"
+BACKEND_SETTING = "capture/backend"
+# Versioned, so results of an older benchmark are measured again: v1 timed XShm cache hits
+BENCHMARK_SETTING = "capture/benchmark_v2"
+BENCHMARK_GRABS = 10
+
+
+def primary_monitor():
+    """(left, top, width, height) of the monitor every backend captures, mss monitor 1.
+
+    Returns None where mss cannot list the monitors.
+    """
+    try:
+        import mss
+        with mss.mss() as sct:
+            monitor = sct.monitors[1]
+    except Exception:
+        return None
+    return monitor["left"], monitor["top"], monitor["width"], monitor["height"]
+
+
+class QtFrameSource(FrameSource):
+    """Frames of the primary monitor grabbed through Qt"""
+    gui_thread_only = True
+
+    def __init__(self):
+        from PyQt5.QtCore import QThread
+        from PyQt5.QtGui import QGuiApplication
+        app = QGuiApplication.instance()
+        if app is None:
+            raise RuntimeError("Qt capture needs a running QApplication")
+        if QThread.currentThread() is not app.thread():
+            raise RuntimeError("Qt capture only works on the GUI thread")
+        self.screen = QGuiApplication.primaryScreen()
+        ratio = self.screen.devicePixelRatio()
+        monitor = primary_monitor()
+        if monitor is None:
+            geometry = self.screen.geometry()
+            monitor = (int(geometry.x() * ratio), int(geometry.y() * ratio),
+                       int(geometry.width() * ratio), int(geometry.height() * ratio))
+        # grabWindow(0) alone would return the whole virtual desktop
+        self.grab_rect = tuple(round(value / ratio) for value in monitor)
+        super().__init__(monitor[2], monitor[3])
+
+    def grab(self):
+        from PyQt5.QtGui import QImage
+        image = self.screen.grabWindow(0, *self.grab_rect).toImage().convertToFormat(QImage.Format_ARGB32)
+        if image.isNull():
+            raise RuntimeError("Qt could not grab the screen")
+        # ARGB32 is stored as BGRA in memory on little-endian machines
+        pointer = image.constBits()
+        pointer.setsize(image.byteCount())
+        rows = np.frombuffer(pointer, np.uint8).reshape(image.height(), image.bytesPerLine())
+        return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4).copy()
+
+
+class _XImage(ctypes.Structure):
+    # Only the leading fields are read
+    _fields_ = [("width", ctypes.c_int), ("height", ctypes.c_int), ("xoffset", ctypes.c_int),
+                ("format", ctypes.c_int), ("data", ctypes.c_void_p), ("byte_order", ctypes.c_int),
+                ("bitmap_unit", ctypes.c_int), ("bitmap_bit_order", ctypes.c_int),
+                ("bitmap_pad", ctypes.c_int), ("depth", ctypes.c_int),
+                ("bytes_per_line", ctypes.c_int), ("bits_per_pixel", ctypes.c_int)]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [("shmseg", ctypes.c_ulong), ("shmid", ctypes.c_int),
+                ("shmaddr", ctypes.c_void_p), ("readOnly", ctypes.c_int)]
+
+
+class _XRectangle(ctypes.Structure):
+    _fields_ = [("x", ctypes.c_short), ("y", ctypes.c_short),
+                ("width", ctypes.c_ushort), ("height", ctypes.c_ushort)]
+
+
+def _load_library(name):
+    path = ctypes.util.find_library(name)
+    if path is None:
+        raise RuntimeError(f"lib{name} not found")
+    return ctypes.CDLL(path)
+
+
+ZPIXMAP = 2
+ALL_PLANES = 0xFFFFFFFF
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+X_DAMAGE_REPORT_NON_EMPTY = 3
+X_DAMAGE_NOTIFY = 0
+
+
+class XShmFrameSource(FrameSource):
+    """Frames of the primary monitor copied from the X11 root window through shared memory.
+
+    When the XDamage extension is available, grab() only copies the screen
+    after the server reported damage; otherwise it returns the previous
+    frame. damaged holds the (x, y, width, height) rectangles that changed
+    since the previous grab, or None when every grab is a full copy.
+    """
+
+    def __init__(self):
+        c_void_p, c_ulong, c_int = ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int
+        if not os.environ.get("DISPLAY"):
+            raise RuntimeError("XShm capture needs an X11 display")
+        self.x11 = _load_library("X11")
+        self.xext = _load_library("Xext")
+        self.libc = _load_library("c")
+        self.x11.XOpenDisplay.restype = c_void_p
+        self.x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self.x11.XDefaultScreen.argtypes = [c_void_p]
+        self.x11.XRootWindow.restype = c_ulong
+        self.x11.XRootWindow.argtypes = [c_void_p, c_int]
+        self.x11.XDefaultVisual.restype = c_void_p
+        self.x11.XDefaultVisual.argtypes = [c_void_p, c_int]
+        for name in ("XDisplayWidth", "XDisplayHeight", "XDefaultDepth"):
+            getattr(self.x11, name).argtypes = [c_void_p, c_int]
+        self.x11.XSync.argtypes = [c_void_p, c_int]
+        self.x11.XPending.argtypes = [c_void_p]
+        self.x11.XNextEvent.argtypes = [c_void_p, c_void_p]
+        self.x11.XFree.argtypes = [c_void_p]
+        self.x11.XGetImage.restype = ctypes.POINTER(_XImage)
+        self.x11.XGetImage.argtypes = [c_void_p, c_ulong, c_int, c_int, ctypes.c_uint, ctypes.c_uint, c_ulong,
+                                       c_int]
+        self.x11.XCloseDisplay.argtypes = [c_void_p]
+        self.xext.XShmQueryExtension.argtypes = [c_void_p]
+        self.xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        self.xext.XShmCreateImage.argtypes = [c_void_p, c_void_p, ctypes.c_uint, c_int, c_void_p,
+                                              ctypes.POINTER(_XShmSegmentInfo), ctypes.c_uint,
+                                              ctypes.c_uint]
+        self.xext.XShmAttach.argtypes = [c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        self.xext.XShmDetach.argtypes = [c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        self.xext.XShmGetImage.argtypes = [c_void_p, c_ulong, ctypes.POINTER(_XImage), c_int, c_int,
+                                           c_ulong]
+        self.libc.shmget.argtypes = [c_int, ctypes.c_size_t, c_int]
+        self.libc.shmat.restype = c_void_p
+        self.libc.shmat.argtypes = [c_int, c_void_p, c_int]
+        self.libc.shmdt.argtypes = [c_void_p]
+        self.libc.shmctl.argtypes = [c_int, c_int, c_void_p]
+
+        self.display = self.x11.XOpenDisplay(None)
+        if not self.display:
+            raise RuntimeError("Cannot open the X11 display")
+        self.image = None
+        self.shminfo = _XShmSegmentInfo()
+        self.attached = False
+        self.damage = None
+        self.damaged = None
+        self.frame = None
+        # Last grab_region() result and its rectangle, reused while the region is undamaged
+        self.region_frame = None
+        self.region_rect = None
+        try:
+            if not self.xext.XShmQueryExtension(self.display):
+                raise RuntimeError("The X server has no MIT-SHM extension")
+            screen = self.x11.XDefaultScreen(self.display)
+            self.root = self.x11.XRootWindow(self.display, screen)
+            monitor = primary_monitor() or (0, 0, self.x11.XDisplayWidth(self.display, screen),
+                                            self.x11.XDisplayHeight(self.display, screen))
+            # The root window spans all monitors, only the primary one is copied
+            self.left, self.top = monitor[:2]
+            super().__init__(monitor[2], monitor[3])
+            self.image = self.xext.XShmCreateImage(
+                self.display, self.x11.XDefaultVisual(self.display, screen),
+                self.x11.XDefaultDepth(self.display, screen), ZPIXMAP, None,
+                ctypes.byref(self.shminfo), self.width, self.height)
+            if not self.image or self.image.contents.bits_per_pixel != 32:
+                raise RuntimeError("XShm capture needs a 32 bit visual")
+            size = self.image.contents.bytes_per_line * self.height
+            self.shminfo.shmid = self.libc.shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600)
+            if self.shminfo.shmid < 0:
+                raise RuntimeError("shmget failed")
+            self.shminfo.shmaddr = self.libc.shmat(self.shminfo.shmid, None, 0)
+            self.image.contents.data = self.shminfo.shmaddr
+            self.shminfo.readOnly = 0
+            self.xext.XShmAttach(self.display, ctypes.byref(self.shminfo))
+            self.x11.XSync(self.display, 0)
+            self.attached = True
+            # The segment goes away once both sides have detached
+            self.libc.shmctl(self.shminfo.shmid, IPC_RMID, None)
+            buffer = (ctypes.c_uint8 * size).from_address(self.shminfo.shmaddr)
+            self.pixels = np.frombuffer(buffer, np.uint8).reshape(
+                self.height, self.image.contents.bytes_per_line)[:, :self.width * 4].reshape(
+                self.height, self.width, 4)
+            self._init_damage()
+        except Exception:
+            self.close()
+            raise
+
+    def _init_damage(self):
+        """Track changes with XDamage when the library and extension exist"""
+        c_void_p, c_ulong, c_int = ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int
+        try:
+            self.xdamage = _load_library("Xdamage")
+            self.xfixes = _load_library("Xfixes")
+        except RuntimeError:
+            return
+        event_base, error_base = c_int(), c_int()
+        self.xdamage.XDamageQueryExtension.argtypes = [c_void_p, ctypes.POINTER(c_int),
+                                                       ctypes.POINTER(c_int)]
+        if not self.xdamage.XDamageQueryExtension(self.display, ctypes.byref(event_base),
+                                                  ctypes.byref(error_base)):
+            return
+        self.xdamage.XDamageCreate.restype = c_ulong
+        self.xdamage.XDamageCreate.argtypes = [c_void_p, c_ulong, c_int]
+        self.xdamage.XDamageSubtract.argtypes = [c_void_p, c_ulong, c_ulong, c_ulong]
+        self.xdamage.XDamageDestroy.argtypes = [c_void_p, c_ulong]
+        self.xfixes.XFixesCreateRegion.restype = c_ulong
+        self.xfixes.XFixesCreateRegion.argtypes = [c_void_p, c_void_p, c_int]
+        self.xfixes.XFixesDestroyRegion.argtypes = [c_void_p, c_ulong]
+        self.xfixes.XFixesFetchRegion.restype = ctypes.POINTER(_XRectangle)
+        self.xfixes.XFixesFetchRegion.argtypes = [c_void_p, c_ulong, ctypes.POINTER(c_int)]
+        self.damage_event = event_base.value + X_DAMAGE_NOTIFY
+        self.damage = self.xdamage.XDamageCreate(self.display, self.root, X_DAMAGE_REPORT_NON_EMPTY)
+        self.region = self.xfixes.XFixesCreateRegion(self.display, None, 0)
+        self.event = ctypes.create_string_buffer(192)  # sizeof(XEvent)
+
+    def _fetch_damage(self):
+        """Drain damage events, return the damaged rectangles in frame coordinates or [] if none"""
+        notified = False
+        while self.x11.XPending(self.display):
+            self.x11.XNextEvent(self.display, self.event)
+            if ctypes.c_int.from_buffer(self.event).value == self.damage_event:
+                notified = True
+        if not notified and self.frame is not None:
+            return []
+        self.xdamage.XDamageSubtract(self.display, self.damage, 0, self.region)
+        count = ctypes.c_int()
+        rects = self.xfixes.XFixesFetchRegion(self.display, self.region, ctypes.byref(count))
+        damaged = []
+        for i in range(count.value):
+            # Root window to frame coordinates, keeping only what falls on the monitor
+            x0, y0 = max(rects[i].x - self.left, 0), max(rects[i].y - self.top, 0)
+            x1 = min(rects[i].x - self.left + rects[i].width, self.width)
+            y1 = min(rects[i].y - self.top + rects[i].height, self.height)
+            if x1 > x0 and y1 > y0:
+                damaged.append((x0, y0, x1 - x0, y1 - y0))
+        if rects:
+            self.x11.XFree(rects)
+        return damaged
+
+    def grab(self):
+        if self.damage is not None:
+            self.damaged = self._fetch_damage()
+            if not self.damaged and self.frame is not None:
+                return self.frame.copy()
+        self.xext.XShmGetImage(self.display, self.root, self.image, self.left, self.top, ALL_PLANES)
+        self.frame = self.pixels.copy()
+        return self.frame.copy() if self.damage is not None else self.frame
+
+    def invalidate(self):
+        # Without a previous frame grab() copies even when XDamage reports no change
+        self.frame = None
+        self.region_frame = None
+        self.region_rect = None
+
+    def grab_region(self, x, y, width, height):
+        # XGetImage copies only the region instead of the whole root window
+        x, y = max(0, x), max(0, y)
+        width, height = min(width, self.width - x), min(height, self.height - y)
+        if width <= 0 or height <= 0:
+            return np.empty((0, 0, 4), np.uint8)
+        rect = (x, y, width, height)
+        if self.damage is not None:
+            self.damaged = [r for r in self._fetch_damage()
+                            if r[0] < x + width and x < r[0] + r[2] and r[1] < y + height and y < r[1] + r[3]]
+            if self.region_rect == rect:
+                if not self.damaged:
+                    return self.region_frame.copy()
+            else:
+                self.damaged = [rect]
+        image = self.x11.XGetImage(self.display, self.root, self.left + x, self.top + y, width, height,
+                                   ALL_PLANES, ZPIXMAP)
+        if not image:
+            raise RuntimeError("XGetImage failed")
+        try:
+            contents = image.contents
+            buffer = (ctypes.c_uint8 * (contents.bytes_per_line * height)).from_address(contents.data)
+            frame = np.frombuffer(buffer, np.uint8).reshape(height, contents.bytes_per_line)[:, :width * 4].reshape(
+                height, width, 4).copy()
+        finally:
+            # What XDestroyImage does for an image from XGetImage
+            self.x11.XFree(image.contents.data)
+            self.x11.XFree(image)
+        if self.damage is not None:
+            self.region_frame, self.region_rect = frame, rect
+            return frame.copy()
+        return frame
+
+    def close(self):
+        if not self.display:
+            return
+        if self.damage is not None:
+            self.xdamage.XDamageDestroy(self.display, self.damage)
+            self.xfixes.XFixesDestroyRegion(self.display, self.region)
+            self.damage = None
+        if self.attached:
+            self.xext.XShmDetach(self.display, ctypes.byref(self.shminfo))
+            self.attached = False
+        if self.image:
+            # Frees the structure only, the pixels live in the shared segment
+            self.x11.XFree(self.image)
+            self.image = None
+        if self.shminfo.shmaddr:
+            self.libc.shmdt(self.shminfo.shmaddr)
+            self.shminfo.shmaddr = None
+        self.x11.XCloseDisplay(self.display)
+        self.display = None
+
+
+BACKENDS = {
+    "mss": MssFrameSource,
+    "qt": QtFrameSource,
+    "xshm": XShmFrameSource,
+}
+
+
+def create_backend(name):
+    """Open a capture backend by name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown capture backend: {name}")
+    return BACKENDS[name]()
+
+
+def benchmark_backends(names=None, grabs=BENCHMARK_GRABS):
+    """Median grab latency in ms of every backend that works here"""
+    results = {}
+    for name in names or BACKENDS:
+        try:
+            with create_backend(name) as source:
+                source.grab()  # warm up
+                times = []
+                for _ in range(grabs):
+                    # Time real copies, not frames XShm reuses while XDamage reports no change
+                    source.invalidate()
+                    start = time.perf_counter()
+                    source.grab()
+                    times.append((time.perf_counter() - start) * 1000)
+            results[name] = round(float(np.median(times)), 3)
+        except Exception as e:
+            print(f"Capture backend {name} unavailable: {e}")
+    return results
+
+
+def display_key():
+    """Identify the display configuration the benchmark was run on"""
+    from PyQt5.QtGui import QGuiApplication
+    if QGuiApplication.instance() is None:
+        return os.environ.get("DISPLAY", "default")
+    screens = []
+    for screen in QGuiApplication.screens():
+        geometry = screen.geometry()
+        screens.append(f"{screen.name()}:{geometry.width()}x{geometry.height()}"
+                       f"+{geometry.x()}+{geometry.y()}@{screen.devicePixelRatio():g}")
+    return f"{QGuiApplication.platformName()}|{';'.join(screens)}"
+
+
+def _settings():
+    from PyQt5.QtCore import QSettings
+    return QSettings("screenshot-tool", "Screenshot Tool")
+
+
+def cached_benchmark(rebenchmark=False):
+    """Benchmark results for this display configuration, measured once"""
+    settings = _settings()
+    key = f"{BENCHMARK_SETTING}/{display_key().replace('/', '_')}"
+    cached = settings.value(key)
+    if cached and not rebenchmark:
+        return json.loads(cached)
+    results = benchmark_backends()
+    # Try again next time if nothing worked, e.g. before the display was up
+    if results:
+        settings.setValue(key, json.dumps(results))
+    return results
+
+
+def select_backend(gui_thread=True):
+    """Name of the capture backend to use, or the frame source spec from the environment.
+
+    A backend chosen in the settings wins over the benchmark; pass
+    gui_thread=False for sources opened on a worker thread.
+    """
+    if os.environ.get(FRAME_SOURCE_ENV):
+        return os.environ[FRAME_SOURCE_ENV]
+    override = _settings().value(BACKEND_SETTING, BACKEND_AUTO)
+    if override != BACKEND_AUTO and override in BACKENDS:
+        if gui_thread or not getattr(BACKENDS[override], "gui_thread_only", False):
+            return override
+    results = {name: ms for name, ms in cached_benchmark().items()
+               if gui_thread or not getattr(BACKENDS.get(name), "gui_thread_only", False)}
+    if not results:
+        return "mss"
+    return min(results, key=results.get)
+
+
+def set_backend_override(name):
+    """Pin a backend by name, or go back to automatic selection with "auto\""""
+    if name != BACKEND_AUTO and name not in BACKENDS:
+        raise ValueError(f"Unknown capture backend: {name}")
+    _settings().setValue(BACKEND_SETTING, name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark and choose the screen capture backend")
+    parser.add_argument("--rebenchmark", action="store_true", help="ignore the cached timings")
+    parser.add_argument("--use", choices=(BACKEND_AUTO,) + tuple(BACKENDS),
+                        help="override the automatic choice")
+    args = parser.parse_args(argv)
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    if args.use:
+        set_backend_override(args.use)
+    for name, ms in sorted(cached_benchmark(args.rebenchmark).items(), key=lambda item: item[1]):
+        print(f"{name:6} {ms:8.2f} ms")
+    print(f"Screenshots use {select_backend()}, recordings use {select_backend(gui_thread=False)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
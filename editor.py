@@ -1,20 +1,39 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QPushButton, QLabel, QToolBar,
                              QButtonGroup, QGraphicsView, QGraphicsScene, QColorDialog,
-                             QFileDialog, QDialog, QMessageBox, QApplication, QGraphicsPixmapItem)
-from PyQt5.QtCore import Qt, QRectF, QTimer, QPointF
+                             QFileDialog, QDialog, QMessageBox, QApplication, QGraphicsPixmapItem,
+                             QGraphicsRectItem, QGraphicsItem)
+from PyQt5.QtCore import Qt, QRectF, QTimer, QPointF, QEvent, QThreadPool
 from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QPen, QPainterPath, QFont
+import os
+import math
+import time
 import numpy as np
 from enum import Enum, auto
+from image_utils import qimage_to_array, save_image, DEFAULT_PNG_COMPRESSION
+from image_diff import load_image, compare_images, mask_to_rgba
+from phash import PerceptualIndex, image_hashes
+from path_simplify import StrokeSimplifier
+import tracing
+from project import (PROJECT_EXTENSION, project_image_path, save_project, load_project,
+                     ImageLoadSignals, ImageLoader)
 
 class DrawingTool(Enum):
     ARROW = auto()
     RECTANGLE = auto()
     TEXT = auto()
+    PEN = auto()
+    SELECT = auto()
+
+# Leaf cells of the BSP index cover about this many scene pixels
+INDEX_CELL_AREA = 256 * 256
+MAX_INDEX_DEPTH = 12
 
 class GraphicsScene(QGraphicsScene):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.current_path = None
+        # Simplifier of the freehand stroke being drawn
+        self.stroke = None
         self.current_tool = DrawingTool.ARROW
         self.pen_color = QColor('#FF0000')  # Default red
         self.pen_width = 2
@@ -24,7 +43,20 @@ class GraphicsScene(QGraphicsScene):
         self.text_item = None
         self.text_content = ""
 
+    def tune_index(self, rect):
+        """Fix the BSP depth to the capture size.
+
+        Qt otherwise derives the depth from the item count and rebuilds the
+        whole index as annotations are added.
+        """
+        cells = max(1.0, rect.width() * rect.height() / INDEX_CELL_AREA)
+        self.setBspTreeDepth(min(MAX_INDEX_DEPTH, max(1, math.ceil(math.log2(cells)))))
+
     def mousePressEvent(self, event):
+        if self.current_tool == DrawingTool.SELECT:
+            # Qt hit-tests through the BSP index and moves the selected items
+            super().mousePressEvent(event)
+            return
         pos = event.scenePos()
         if self.current_tool == DrawingTool.TEXT:
             # Remove any existing temporary text item
@@ -36,17 +68,31 @@ class GraphicsScene(QGraphicsScene):
             self.text_item = self.addText(self.text_content, self.text_font)
             self.text_item.setDefaultTextColor(self.pen_color)
             self.text_item.setPos(pos)
+        elif self.current_tool == DrawingTool.PEN:
+            self.last_point = pos
+            self.current_path = QPainterPath()
+            self.current_path.moveTo(pos)
+            self.stroke = StrokeSimplifier((pos.x(), pos.y()))
+            pen = QPen(self.pen_color, self.pen_width, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+            self.current_item = self.addPath(self.current_path, pen)
         else:
             self.last_point = pos
             self.current_path = QPainterPath()
             self.current_path.moveTo(pos)
 
     def mouseMoveEvent(self, event):
+        if self.current_tool == DrawingTool.SELECT:
+            super().mouseMoveEvent(event)
+            return
         if self.last_point is None or self.current_tool == DrawingTool.TEXT:
             return
         
         pos = event.scenePos()
         
+        if self.current_tool == DrawingTool.PEN:
+            self.extend_stroke(self.stroke.add((pos.x(), pos.y())))
+            return
+        
         # Remove the previous temporary item if it exists
         if self.current_item:
             self.removeItem(self.current_item)
@@ -79,13 +125,44 @@ class GraphicsScene(QGraphicsScene):
         pen = QPen(self.pen_color, self.pen_width)
         self.current_item = self.addPath(path, pen)
 
+    def extend_stroke(self, committed):
+        """Append committed points to the stroke and show it with its raw tail"""
+        if self.current_item is None:
+            return
+        for x, y in committed:
+            self.current_path.lineTo(x, y)
+        if not committed and not self.stroke.tail:
+            return
+        path = QPainterPath(self.current_path)
+        for x, y in self.stroke.tail:
+            path.lineTo(x, y)
+        self.current_item.setPath(path)
+
     def mouseReleaseEvent(self, event):
-        if self.current_item:
+        if self.current_tool == DrawingTool.SELECT:
+            super().mouseReleaseEvent(event)
+        elif self.current_tool == DrawingTool.PEN and self.stroke is not None:
+            pos = event.scenePos()
+            self.extend_stroke(self.stroke.finish((pos.x(), pos.y())))
+            self.stroke = None
+            self.current_item = None
+            self.last_point = None
+        elif self.current_item:
             # The temporary item becomes permanent
             self.current_item = None
             self.last_point = None
 
     def keyPressEvent(self, event):
+        if self.current_tool == DrawingTool.SELECT:
+            if event.key() in (Qt.Key_Delete, Qt.Key_Backspace):
+                for item in self.selectedItems():
+                    if item is self.text_item:
+                        # Deleting the text being typed ends its editing
+                        self.text_item = None
+                    self.removeItem(item)
+            elif event.key() == Qt.Key_Escape:
+                self.clearSelection()
+            return
         if self.current_tool == DrawingTool.TEXT and self.text_item:
             if event.key() == Qt.Key_Return or event.key() == Qt.Key_Enter:
                 # Finish text editing
@@ -101,18 +178,27 @@ class GraphicsScene(QGraphicsScene):
                     self.text_content += char
                     self.text_item.setPlainText(self.text_content)
 
+class DuplicatePolicy(Enum):
+    OFF = auto()   # Save without checking for near-duplicates
+    ASK = auto()   # Warn and let the user decide
+    SKIP = auto()  # Never save near-duplicates
+
 class EditorWidget(QWidget):
-    def __init__(self, screenshot, parent=None):
+    def __init__(self, screenshot=None, parent=None):
         super().__init__(parent)
-        
-        if isinstance(screenshot, QImage):
-            self.screenshot = screenshot
-        elif isinstance(screenshot, np.ndarray):
-            height, width, channel = screenshot.shape
-            bytes_per_line = 3 * width
-            self.screenshot = QImage(screenshot.data, width, height, bytes_per_line, QImage.Format_RGB888)
-        else:
-            raise ValueError("Screenshot must be QImage or numpy array")
+        self.duplicate_policy = DuplicatePolicy.ASK
+        self.png_compression = DEFAULT_PNG_COMPRESSION
+        # Threads for large PNG exports, None for one per core
+        self.export_workers = None
+        self.screenshot = None
+        self.pixmap_item = None
+        # Project the annotations were last saved to or opened from
+        self.project_path = None
+        self.pending_image_path = None
+        # Overlay items of the diff mode
+        self.diff_items = []
+        self.image_signals = ImageLoadSignals(self)
+        self.image_signals.loaded.connect(self.project_image_loaded)
             
         # Create main layout
         layout = QVBoxLayout(self)
@@ -121,49 +207,23 @@ class EditorWidget(QWidget):
         
         # Create toolbar with modern style
         toolbar = QToolBar()
+        toolbar.setObjectName("editorToolbar")
         toolbar.setMovable(True)  # Allow toolbar to be moved
         toolbar.setFloatable(True)  # Allow toolbar to float
         toolbar.setOrientation(Qt.Horizontal)  # Set horizontal orientation
         toolbar.setAllowedAreas(Qt.AllToolBarAreas)  # Allow toolbar in all areas
         
-        toolbar.setStyleSheet("""
-            QToolBar {
-                background: #2d2d2d;
-                border: none;
-                spacing: 8px;
-                padding: 8px;
-                border-radius: 4px;
-                margin: 4px;
-            }
-            QPushButton {
-                background: #3d3d3d;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 4px;
-                font-size: 13px;
-                min-width: 80px;
-            }
-            QPushButton:hover {
-                background: #4d4d4d;
-            }
-            QPushButton:pressed {
-                background: #5d5d5d;
-            }
-            QPushButton:checked {
-                background: #0078d4;
-            }
-            QLabel {
-                color: #ffffff;
-                font-size: 13px;
-                padding: 0 8px;
-            }
-        """)
-        
         # Create tool buttons with icons
-        arrow_btn = QPushButton("🎯 Arrow")
-        arrow_btn.setCheckable(True)
-        arrow_btn.setChecked(True)
+        select_btn = QPushButton("🖱 Select")
+        select_btn.setCheckable(True)
+        select_btn.setToolTip("Click or drag to select annotations, drag to move, Delete to remove")
+        
+        self.arrow_btn = QPushButton("🎯 Arrow")
+        self.arrow_btn.setCheckable(True)
+        self.arrow_btn.setChecked(True)
+        
+        pen_btn = QPushButton("✏️ Pen")
+        pen_btn.setCheckable(True)
         
         rect_btn = QPushButton("⬜ Rectangle")
         rect_btn.setCheckable(True)
@@ -172,7 +232,9 @@ class EditorWidget(QWidget):
         text_btn.setCheckable(True)
         
         # Add buttons to toolbar with spacers
-        toolbar.addWidget(arrow_btn)
+        toolbar.addWidget(select_btn)
+        toolbar.addWidget(self.arrow_btn)
+        toolbar.addWidget(pen_btn)
         toolbar.addWidget(rect_btn)
         toolbar.addWidget(text_btn)
         
@@ -190,11 +252,33 @@ class EditorWidget(QWidget):
         save_btn.clicked.connect(self.save_screenshot)
         toolbar.addWidget(save_btn)
         
+        toolbar.addWidget(QLabel("|"))  # Separator
+        
+        # Re-editable projects
+        open_project_btn = QPushButton("📂 Open Project")
+        open_project_btn.clicked.connect(self.open_project)
+        toolbar.addWidget(open_project_btn)
+        
+        save_project_btn = QPushButton("🗂 Save Project")
+        save_project_btn.clicked.connect(self.save_project)
+        toolbar.addWidget(save_project_btn)
+        
+        toolbar.addWidget(QLabel("|"))  # Separator
+        
+        # Compare against an earlier capture
+        self.diff_btn = QPushButton("🔍 Diff")
+        self.diff_btn.setCheckable(True)
+        self.diff_btn.setToolTip("Highlight what changed since another screenshot")
+        self.diff_btn.toggled.connect(self.toggle_diff)
+        toolbar.addWidget(self.diff_btn)
+        
         # Create button group for exclusive selection
         self.tool_group = QButtonGroup(self)
-        self.tool_group.addButton(arrow_btn, 0)
+        self.tool_group.addButton(self.arrow_btn, 0)
         self.tool_group.addButton(rect_btn, 1)
         self.tool_group.addButton(text_btn, 2)
+        self.tool_group.addButton(pen_btn, 3)
+        self.tool_group.addButton(select_btn, 4)
         self.tool_group.buttonClicked.connect(self.tool_changed)
         
         # Add toolbar to layout
@@ -203,6 +287,7 @@ class EditorWidget(QWidget):
         # Create graphics view
         self.scene = GraphicsScene(self)
         self.view = QGraphicsView(self.scene)
+        self.view.setObjectName("editorView")
         
         # Set view properties for better quality
         self.view.setRenderHint(QPainter.Antialiasing, True)
@@ -215,61 +300,193 @@ class EditorWidget(QWidget):
         self.view.setFocusPolicy(Qt.StrongFocus)
         self.view.setFocus()
         
-        # Set dark theme for view
-        self.view.setStyleSheet("""
-            QGraphicsView {
-                border: none;
-                background: #1e1e1e;
-            }
-            QScrollBar:vertical {
-                border: none;
-                background: #2d2d2d;
-                width: 12px;
-                margin: 0;
-            }
-            QScrollBar::handle:vertical {
-                background: #5d5d5d;
-                min-height: 20px;
-                border-radius: 6px;
-                margin: 2px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background: #6d6d6d;
-            }
-            QScrollBar:horizontal {
-                border: none;
-                background: #2d2d2d;
-                height: 12px;
-                margin: 0;
-            }
-            QScrollBar::handle:horizontal {
-                background: #5d5d5d;
-                min-width: 20px;
-                border-radius: 6px;
-                margin: 2px;
-            }
-            QScrollBar::handle:horizontal:hover {
-                background: #6d6d6d;
-            }
-            QScrollBar::add-line, QScrollBar::sub-line {
-                border: none;
-                background: none;
-            }
-        """)
+        layout.addWidget(self.view)
+        
+        if screenshot is not None:
+            self.set_image(screenshot)
+
+    def set_image(self, screenshot):
+        """Show a new screenshot, dropping the annotations of the previous one"""
+        if isinstance(screenshot, QImage):
+            image = screenshot
+        elif isinstance(screenshot, np.ndarray):
+            height, width, channel = screenshot.shape
+            bytes_per_line = 3 * width
+            image = QImage(screenshot.data, width, height, bytes_per_line, QImage.Format_RGB888)
+        else:
+            raise ValueError("Screenshot must be QImage or numpy array")
+        
+        # Start from a clean scene and the default tool and color
+        self.clear_image()
+        self.screenshot = image
+        self.project_path = None
+        self.reset_tools()
         
         # Add screenshot to scene
+        self.add_pixmap_item()
+        self.scene.setSceneRect(self.pixmap_item.boundingRect())
+        self.scene.tune_index(self.scene.sceneRect())
+        
+        # Fit view to window
+        self.fit_to_view()
+
+    def add_pixmap_item(self):
         pixmap = QPixmap.fromImage(self.screenshot)
         self.pixmap_item = QGraphicsPixmapItem(pixmap)
         self.pixmap_item.setTransformationMode(Qt.SmoothTransformation)
+        # Behind annotations that may already be in the scene
+        self.pixmap_item.setZValue(-1)
         self.scene.addItem(self.pixmap_item)
-        self.scene.setSceneRect(self.pixmap_item.boundingRect())
+
+    def clear_image(self):
+        """Drop the screenshot and its annotations"""
+        self.scene.clear()
+        self.scene.current_item = None
+        self.scene.current_path = None
+        self.scene.stroke = None
+        self.scene.last_point = None
+        self.scene.text_item = None
+        self.scene.text_content = ""
+        self.pixmap_item = None
+        self.screenshot = None
+        self.pending_image_path = None
+        self.diff_items = []
+        self.diff_btn.setChecked(False)
+
+    def reset_tools(self):
+        self.scene.current_tool = DrawingTool.ARROW
+        self.scene.pen_color = QColor('#FF0000')
+        self.arrow_btn.setChecked(True)
+        self.view.setDragMode(QGraphicsView.NoDrag)
+        self.color_btn.setStyleSheet("")
+
+    def annotation_items(self):
+        """Annotations in stacking order, without the screenshot and diff overlay"""
+        excluded = set(self.diff_items)
+        excluded.add(self.pixmap_item)
+        return [item for item in self.scene.items(Qt.AscendingOrder)
+                if item.parentItem() is None and item not in excluded]
+
+    def toggle_diff(self, enabled):
+        if not enabled:
+            for item in self.diff_items:
+                self.scene.removeItem(item)
+            self.diff_items = []
+            return
+        if self.diff_items:
+            return
+        filename, _ = QFileDialog.getOpenFileName(self, "Compare With Earlier Screenshot", "",
+                                                  "Images (*.png *.jpg *.jpeg *.webp *.bmp)")
+        if not filename:
+            self.diff_btn.setChecked(False)
+            return
+        try:
+            self.show_diff(load_image(filename))
+        except Exception as e:
+            print(f"Error comparing screenshots: {e}")
+            self.diff_btn.setChecked(False)
+            QMessageBox.critical(self, "Error", f"Failed to compare screenshots: {str(e)}")
+
+    def show_diff(self, before):
+        """Overlay the pixels and regions that differ from an RGB before image"""
+        self.ensure_image()
+        after = qimage_to_array(self.screenshot)
+        result = compare_images(before, after)
         
-        layout.addWidget(self.view)
+        # Tinted changed pixels above the screenshot, below the annotations
+        layer = mask_to_rgba(result.mask)
+        height, width = layer.shape[:2]
+        image = QImage(layer.data, width, height, width * 4, QImage.Format_RGBA8888).copy()
+        mask_item = QGraphicsPixmapItem(QPixmap.fromImage(image))
+        mask_item.setZValue(-0.5)
+        self.scene.addItem(mask_item)
+        self.diff_items = [mask_item]
         
-        # Fit view to window
-        QTimer.singleShot(100, self.fit_to_view)
+        pen = QPen(QColor('#FF0000'), 2)
+        pen.setCosmetic(True)
+        for x, y, w, h in result.boxes:
+            box = QGraphicsRectItem(x, y, w, h)
+            box.setPen(pen)
+            box.setZValue(-0.5)
+            self.scene.addItem(box)
+            self.diff_items.append(box)
+        self.diff_btn.setToolTip(f"{result.changed_fraction * 100:.2f}% of pixels changed "
+                                 f"in {len(result.boxes)} regions")
+
+    def open_project(self):
+        filename, _ = QFileDialog.getOpenFileName(self, "Open Project", "",
+                                                  f"Screenshot Projects (*{PROJECT_EXTENSION})")
+        if filename:
+            try:
+                self.load_project(filename)
+            except Exception as e:
+                print(f"Error opening project: {e}")
+                QMessageBox.critical(self, "Error", f"Failed to open project: {str(e)}")
+
+    def load_project(self, filename):
+        """Show the annotations right away and decode the image in the background"""
+        image_path, size, items = load_project(filename)
+        self.clear_image()
+        self.reset_tools()
+        self.scene.setSceneRect(QRectF(0, 0, size[0], size[1]))
+        self.scene.tune_index(self.scene.sceneRect())
+        for item in items:
+            self.scene.addItem(item)
+        self.project_path = filename
+        self.pending_image_path = image_path
+        QThreadPool.globalInstance().start(ImageLoader(image_path, self.image_signals))
+        self.fit_to_view()
+
+    def project_image_loaded(self, path, image):
+        # Ignore images of a project that has been replaced in the meantime
+        if path != self.pending_image_path or self.pixmap_item is not None:
+            return
+        self.pending_image_path = None
+        if image.isNull():
+            QMessageBox.warning(self, "Project", f"The project image could not be loaded:\n{path}")
+            return
+        self.screenshot = image
+        self.add_pixmap_item()
+
+    def ensure_image(self):
+        """Load a project image that is still decoding in the background"""
+        if self.pixmap_item is None and self.pending_image_path:
+            self.project_image_loaded(self.pending_image_path, QImage(self.pending_image_path))
+
+    def save_project(self):
+        """Save the annotations; the image is only written for a new project"""
+        image = None
+        if self.project_path is None:
+            filename, _ = QFileDialog.getSaveFileName(self, "Save Project", "",
+                                                      f"Screenshot Projects (*{PROJECT_EXTENSION})")
+            if not filename:
+                return
+            if not filename.endswith(PROJECT_EXTENSION):
+                filename += PROJECT_EXTENSION
+            self.ensure_image()
+            image = self.screenshot
+        else:
+            filename = self.project_path
+            if not os.path.exists(project_image_path(filename)):
+                self.ensure_image()
+                image = self.screenshot
+        size = self.scene.sceneRect().size().toSize()
+        try:
+            save_project(filename, self.annotation_items(), (size.width(), size.height()), image)
+        except Exception as e:
+            print(f"Error saving project: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to save project: {str(e)}")
+            return
+        self.project_path = filename
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Keep the whole screenshot in view, also on the first layout
+        self.fit_to_view()
 
     def fit_to_view(self):
+        if self.pixmap_item is None:
+            return
         self.view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
 
     def tool_changed(self, button):
@@ -279,6 +496,19 @@ class EditorWidget(QWidget):
             self.scene.current_tool = DrawingTool.RECTANGLE
         elif button.text() == "📝 Text":
             self.scene.current_tool = DrawingTool.TEXT
+        elif button.text() == "✏️ Pen":
+            self.scene.current_tool = DrawingTool.PEN
+        elif button.text() == "🖱 Select":
+            self.scene.current_tool = DrawingTool.SELECT
+        
+        selecting = self.scene.current_tool == DrawingTool.SELECT
+        # The screenshot and the diff overlay never become selectable
+        for item in self.annotation_items():
+            item.setFlag(QGraphicsItem.ItemIsSelectable, selecting)
+            item.setFlag(QGraphicsItem.ItemIsMovable, selecting)
+        if not selecting:
+            self.scene.clearSelection()
+        self.view.setDragMode(QGraphicsView.RubberBandDrag if selecting else QGraphicsView.NoDrag)
 
     def choose_color(self):
         color = QColorDialog.getColor(self.scene.pen_color, self)
@@ -302,34 +532,101 @@ class EditorWidget(QWidget):
     def save_screenshot(self):
         filename, _ = QFileDialog.getSaveFileName(self, "Save Screenshot", "", "PNG Files (*.png);;JPEG Files (*.jpg)")
         if filename:
-            # Create a pixmap the size of the scene
-            pixmap = QPixmap(self.scene.sceneRect().size().toSize())
-            pixmap.fill(Qt.transparent)
-            
-            # Create a painter to render the scene
-            painter = QPainter(pixmap)
-            painter.setRenderHint(QPainter.Antialiasing, True)
-            painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
-            painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
-            
-            # Render the scene
-            self.scene.render(painter)
-            painter.end()
-            
-            # Save with high quality
-            if filename.lower().endswith('.png'):
-                pixmap.save(filename, 'PNG', quality=100)
-            else:
-                pixmap.save(filename, 'JPEG', quality=100)
+            with tracing.span("save_screenshot", file=filename):
+                self.save_to(filename)
+
+    def save_to(self, filename):
+        """Render the annotated screenshot and write it to filename"""
+        with tracing.span("render_scene"):
+            pixmap = self.render_scene()
+        
+        # Check the target directory for near-identical captures
+        index = None
+        hashes = None
+        if self.duplicate_policy != DuplicatePolicy.OFF:
+            try:
+                with tracing.span("duplicate_check"):
+                    index = PerceptualIndex(os.path.dirname(filename) or ".")
+                    # Also picks up files written elsewhere, e.g. by watch mode or batch runs
+                    if index.refresh():
+                        index.save()
+                    hashes = image_hashes(qimage_to_array(pixmap.toImage()))
+                    similar = [(name, distance) for name, distance in index.find_similar(hashes)
+                               if name != os.path.basename(filename)]
+            except Exception as e:
+                print(f"Error checking for duplicates: {e}")
+                index = None
+                similar = []
+            if similar and not self.confirm_duplicate(similar[0][0]):
+                return
+        
+        try:
+            with tracing.span("export_image", size=[pixmap.width(), pixmap.height()]):
+                self.export_image(pixmap, filename)
+        except IOError as e:
+            tracing.instant("save_error", error=str(e))
+            QMessageBox.critical(self, "Error", f"Failed to save screenshot: {e}")
+            return
+        
+        # Record the new file so later saves can be compared against it
+        if index is not None:
+            try:
+                index.add_file(filename, hashes)
+                index.save()
+            except Exception as e:
+                print(f"Error updating hash index: {e}")
+
+    def render_scene(self):
+        """Render the screenshot and its annotations into a pixmap"""
+        self.ensure_image()
+        # Create a pixmap the size of the scene
+        pixmap = QPixmap(self.scene.sceneRect().size().toSize())
+        pixmap.fill(Qt.transparent)
+        
+        # Create a painter to render the scene
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
+        
+        # Render the scene without selection outlines
+        selected = self.scene.selectedItems()
+        self.scene.clearSelection()
+        self.scene.render(painter)
+        painter.end()
+        for item in selected:
+            item.setSelected(True)
+        return pixmap
+
+    def export_image(self, pixmap, filename):
+        """Encode the rendered pixmap to disk"""
+        # Save with high quality; large PNGs are compressed on all cores
+        save_image(pixmap, filename, quality=100, compression=self.png_compression,
+                   workers=self.export_workers)
+
+    def confirm_duplicate(self, existing_name):
+        """Return True if a near-duplicate screenshot should be saved anyway"""
+        if self.duplicate_policy == DuplicatePolicy.SKIP:
+            QMessageBox.information(self, "Duplicate Screenshot",
+                                    f"Not saved: a near-identical screenshot already exists ({existing_name}).")
+            return False
+        reply = QMessageBox.question(self, "Duplicate Screenshot",
+                                     f"A near-identical screenshot already exists:\n{existing_name}\n\nSave anyway?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        return reply == QMessageBox.Yes
 
     def keyPressEvent(self, event):
         # Forward key events to the scene
         self.scene.keyPressEvent(event)
 
 class EditorDialog(QDialog):
-    def __init__(self, screenshot, parent=None):
+    def __init__(self, screenshot=None, parent=None):
         super().__init__(parent)
+        self.setObjectName("editorDialog")
+        apply_editor_theme()
         self.edited_screenshot = None
+        self.open_started = None
+        self.open_latency_ms = None
         self.setWindowTitle("✏️ Edit Screenshot")
         self.setModal(True)
         
@@ -351,52 +648,134 @@ class EditorDialog(QDialog):
         # Create editor widget
         self.editor = EditorWidget(screenshot, self)
         layout.addWidget(self.editor)
-        
-        # Set dark theme
-        self.setStyleSheet("""
-            QDialog {
-                background: #1e1e1e;
-                color: white;
-            }
-            QToolBar {
-                background: #2d2d2d;
-                border: none;
-                spacing: 8px;
-                padding: 8px;
-                border-radius: 4px;
-                margin: 4px;
-            }
-            QMessageBox {
-                background: #2d2d2d;
-                color: white;
-            }
-            QMessageBox QPushButton {
-                background: #3d3d3d;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 4px;
-                min-width: 80px;
-            }
-            QMessageBox QPushButton:hover {
-                background: #4d4d4d;
-            }
-            QColorDialog {
-                background: #2d2d2d;
-                color: white;
-            }
-            QColorDialog QPushButton {
-                background: #3d3d3d;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 4px;
-                min-width: 80px;
-            }
-            QColorDialog QPushButton:hover {
-                background: #4d4d4d;
-            }
-        """)
+        self.editor.view.viewport().installEventFilter(self)
         
         # Ensure dialog stays on top
         self.setWindowFlags(self.windowFlags() | Qt.WindowStaysOnTopHint)
+
+    def prewarm(self):
+        """Do the styling and layout work up front so the first open is fast"""
+        self.ensurePolished()
+        for widget in self.findChildren(QWidget):
+            widget.ensurePolished()
+        self.layout().activate()
+        self.editor.layout().activate()
+
+    def reset(self, screenshot, started=None):
+        """Reuse the dialog for a new screenshot; started is the perf_counter() of the capture"""
+        self.edited_screenshot = None
+        self.open_started = started
+        self.open_latency_ms = None
+        self.editor.set_image(screenshot)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.open_started is not None:
+            # Measured once the first paint of the screenshot has been handled
+            QTimer.singleShot(0, self.record_open_latency)
+        return super().eventFilter(obj, event)
+
+    def record_open_latency(self):
+        if self.open_started is None:
+            return
+        self.open_latency_ms = (time.perf_counter() - self.open_started) * 1000
+        tracing.complete("editor_open", self.open_started)
+        self.open_started = None
+
+EDITOR_STYLESHEET = """
+    #editorDialog {
+        background: #1e1e1e;
+        color: white;
+    }
+    #editorToolbar {
+        background: #2d2d2d;
+        border: none;
+        spacing: 8px;
+        padding: 8px;
+        border-radius: 4px;
+        margin: 4px;
+    }
+    #editorToolbar QPushButton {
+        background: #3d3d3d;
+        color: white;
+        border: none;
+        padding: 8px 16px;
+        border-radius: 4px;
+        font-size: 13px;
+        min-width: 80px;
+    }
+    #editorToolbar QPushButton:hover {
+        background: #4d4d4d;
+    }
+    #editorToolbar QPushButton:pressed {
+        background: #5d5d5d;
+    }
+    #editorToolbar QPushButton:checked {
+        background: #0078d4;
+    }
+    #editorToolbar QLabel {
+        color: #ffffff;
+        font-size: 13px;
+        padding: 0 8px;
+    }
+    #editorView {
+        border: none;
+        background: #1e1e1e;
+    }
+    #editorView QScrollBar:vertical {
+        border: none;
+        background: #2d2d2d;
+        width: 12px;
+        margin: 0;
+    }
+    #editorView QScrollBar::handle:vertical {
+        background: #5d5d5d;
+        min-height: 20px;
+        border-radius: 6px;
+        margin: 2px;
+    }
+    #editorView QScrollBar::handle:vertical:hover {
+        background: #6d6d6d;
+    }
+    #editorView QScrollBar:horizontal {
+        border: none;
+        background: #2d2d2d;
+        height: 12px;
+        margin: 0;
+    }
+    #editorView QScrollBar::handle:horizontal {
+        background: #5d5d5d;
+        min-width: 20px;
+        border-radius: 6px;
+        margin: 2px;
+    }
+    #editorView QScrollBar::handle:horizontal:hover {
+        background: #6d6d6d;
+    }
+    #editorView QScrollBar::add-line, #editorView QScrollBar::sub-line {
+        border: none;
+        background: none;
+    }
+    #editorDialog QMessageBox, #editorDialog QColorDialog {
+        background: #2d2d2d;
+        color: white;
+    }
+    #editorDialog QMessageBox QPushButton, #editorDialog QColorDialog QPushButton {
+        background: #3d3d3d;
+        color: white;
+        border: none;
+        padding: 8px 16px;
+        border-radius: 4px;
+        min-width: 80px;
+    }
+    #editorDialog QMessageBox QPushButton:hover, #editorDialog QColorDialog QPushButton:hover {
+        background: #4d4d4d;
+    }
+"""
+
+def apply_editor_theme(app=None):
+    """Add the editor theme to the application stylesheet, parsed once per app"""
+    app = app or QApplication.instance()
+    if app is None or app.property("editorThemeApplied"):
+        return
+    app.setStyleSheet(app.styleSheet() + EDITOR_STYLESHEET)
+    app.setProperty("editorThemeApplied", True)
@@ -0,0 +1,230 @@
+"""Sources of BGRA frames for capturing and recording.
+
+Every source returns frames as numpy arrays of shape (height, width, 4) in
+the BGRA layout mss produces, so the capture and recording pipelines can
+run against the live screen, a recorded clip or generated frames alike.
+
+A source can be chosen with the SCREENSHOT_FRAME_SOURCE environment
+variable, see create_frame_source() for the accepted values.
+"""
+import os
+import glob
+import time
+import numpy as np
+
+FRAME_SOURCE_ENV = "SCREENSHOT_FRAME_SOURCE"
+
+
+class FrameSource:
+    """Base class for frame sources"""
+
+    def __init__(self, width, height, fps=None):
+        self.width = width
+        self.height = height
+        # Nominal frame rate, None for sources that grab on demand
+        self.fps = fps
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def grab(self):
+        """Return the next frame as a BGRA numpy array"""
+        raise NotImplementedError
+
+    def grab_region(self, x, y, width, height):
+        """Return part of the next frame; sources that can grab less than a frame override this"""
+        return self.grab()[y:y + height, x:x + width]
+
+    def invalidate(self):
+        """Make the next grab a real copy for sources that reuse unchanged frames"""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MssFrameSource(FrameSource):
+    """Live frames of a monitor, captured with mss"""
+
+    def __init__(self, monitor_index=1):
+        import mss
+        # mss handles must be used on the thread that created them
+        self.sct = mss.mss()
+        self.monitor = self.sct.monitors[monitor_index]
+        super().__init__(self.monitor["width"], self.monitor["height"])
+
+    def grab(self):
+        return np.asarray(self.sct.grab(self.monitor))
+
+    def grab_region(self, x, y, width, height):
+        # Only the region is copied from the screen, clipped to the monitor
+        x, y = max(0, x), max(0, y)
+        width, height = min(width, self.width - x), min(height, self.height - y)
+        if width <= 0 or height <= 0:
+            return np.empty((0, 0, 4), np.uint8)
+        return np.asarray(self.sct.grab({"left": self.monitor["left"] + x, "top": self.monitor["top"] + y,
+                                         "width": width, "height": height}))
+
+    def close(self):
+        self.sct.close()
+
+
+class ReplayFrameSource(FrameSource):
+    """Replays a video file, or an image sequence given as a directory or glob"""
+
+    def __init__(self, path, loop=True):
+        import cv2
+        self.loop = loop
+        self.capture = None
+        self.files = []
+        self.position = 0
+        if os.path.isdir(path):
+            path = os.path.join(path, "*")
+        if any(char in path for char in "*?["):
+            self.files = sorted(f for f in glob.glob(path) if cv2.haveImageReader(f))
+            if not self.files:
+                raise ValueError(f"No images match {path}")
+            height, width = self._read_image(self.files[0]).shape[:2]
+            super().__init__(width, height)
+        else:
+            self.capture = cv2.VideoCapture(path)
+            if not self.capture.isOpened():
+                raise ValueError(f"Cannot open video {path}")
+            width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            super().__init__(width, height, self.capture.get(cv2.CAP_PROP_FPS) or None)
+
+    def _read_image(self, path):
+        import cv2
+        frame = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if frame is None:
+            raise ValueError(f"Cannot read image {path}")
+        if frame.ndim == 2:
+            return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGRA)
+        if frame.shape[2] == 3:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+        return frame
+
+    def grab(self):
+        import cv2
+        if self.capture is None:
+            if self.position >= len(self.files):
+                if not self.loop:
+                    raise EOFError("End of image sequence")
+                self.position = 0
+            frame = self._read_image(self.files[self.position])
+            self.position += 1
+            if frame.shape[:2] != (self.height, self.width):
+                frame = cv2.resize(frame, (self.width, self.height))
+            return frame
+
+        ok, frame = self.capture.read()
+        if not ok and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read()
+        if not ok:
+            raise EOFError("End of video")
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+
+
+def synthetic_desktop(width, height, seed=0):
+    """Deterministic BGRA frame that looks roughly like a desktop"""
+    rng = np.random.default_rng(seed)
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    frame[:] = (48, 43, 43, 255)
+    # Windows and panels
+    for _ in range(12):
+        x, y = rng.integers(0, max(1, width - 64)), rng.integers(0, max(1, height - 64))
+        w, h = rng.integers(32, max(33, width // 2)), rng.integers(32, max(33, height // 2))
+        frame[y:y + h, x:x + w, :3] = rng.integers(0, 256, 3)
+    # Lines of "text" made of short dark runs
+    for y in range(40, height - 20, 24):
+        row = rng.random(width) < 0.35
+        frame[y:y + 12, row, :3] = 20
+    return frame
+
+
+class SyntheticFrameSource(FrameSource):
+    """Procedural desktop-like frames where a set fraction changes per frame.
+
+    change_rate is the fraction of the frame area repainted on every grab,
+    0 gives a static screen and 1 a completely new frame each time. When
+    fps is given, grab() blocks like a live source delivering that rate.
+    """
+
+    def __init__(self, width=1920, height=1080, change_rate=0.05, fps=None, seed=0):
+        super().__init__(width, height, fps)
+        self.change_rate = change_rate
+        self.rng = np.random.default_rng(seed)
+        self.frame = synthetic_desktop(width, height, seed)
+        self.next_time = None
+
+    def _repaint(self):
+        area = self.change_rate * self.width * self.height
+        if area < 1:
+            return
+        # Repaint one block of roughly the requested area, like a window update
+        aspect = self.rng.uniform(0.5, 2.0)
+        w = int(min(self.width, max(1, np.sqrt(area * aspect))))
+        h = int(min(self.height, max(1, area / w)))
+        x = self.rng.integers(0, self.width - w + 1)
+        y = self.rng.integers(0, self.height - h + 1)
+        block = self.frame[y:y + h, x:x + w, :3]
+        block[:] = self.rng.integers(0, 256, 3)
+        # Some "text" so the block is not trivially compressible
+        block[::6, self.rng.random(w) < 0.3] = 20
+
+    def grab(self):
+        if self.fps:
+            now = time.perf_counter()
+            if self.next_time is not None and now < self.next_time:
+                time.sleep(self.next_time - now)
+            self.next_time = max(now, self.next_time or now) + 1.0 / self.fps
+        self._repaint()
+        return self.frame.copy()
+
+
+def create_frame_source(spec=None):
+    """Create a frame source from a spec string.
+
+    Accepted specs:
+        mss[:MONITOR]                          live screen (default, monitor 1)
+        qt, xshm                               live screen, see capture_backends
+        replay:PATH                            video file, directory or glob
+        synthetic[:WIDTHxHEIGHT[@FPS][,RATE]]  generated frames
+
+    Without a spec the SCREENSHOT_FRAME_SOURCE environment variable is used.
+    """
+    if spec is None:
+        spec = os.environ.get(FRAME_SOURCE_ENV, "mss")
+    kind, _, arg = spec.partition(":")
+    if kind == "mss":
+        return MssFrameSource(int(arg) if arg else 1)
+    if kind in ("qt", "xshm"):
+        from capture_backends import create_backend
+        return create_backend(kind)
+    if kind == "replay":
+        return ReplayFrameSource(arg)
+    if kind == "synthetic":
+        width, height, fps, change_rate = 1920, 1080, None, 0.05
+        if arg:
+            size, _, rate = arg.partition(",")
+            size, _, rate_fps = size.partition("@")
+            if size:
+                width, height = (int(v) for v in size.lower().split("x"))
+            if rate_fps:
+                fps = float(rate_fps)
+            if rate:
+                change_rate = float(rate)
+        return SyntheticFrameSource(width, height, change_rate, fps)
+    raise ValueError(f"Unknown frame source: {spec}")
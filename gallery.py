@@ -0,0 +1,276 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QListView, QPushButton,
+                             QLabel, QFileDialog, QMessageBox)
+from PyQt5.QtCore import (Qt, QAbstractListModel, QModelIndex, QSize, QObject, QRunnable,
+                          QThreadPool, QStandardPaths, pyqtSignal)
+from PyQt5.QtGui import QImage, QPixmap, QColor
+from PIL import Image
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+THUMBNAIL_SIZE = 160
+
+# Rows added to the model each time the view scrolls near the end
+PAGE_SIZE = 120
+# Thumbnails kept in memory, about 100 KiB each; older ones are reloaded from the disk cache
+MAX_THUMBNAILS = 500
+
+
+class ThumbnailCache:
+    """On-disk cache of thumbnails keyed by path, file size and mtime"""
+
+    def __init__(self, directory=None, size=THUMBNAIL_SIZE):
+        if directory is None:
+            directory = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation),
+                                     "thumbnails")
+        self.directory = directory
+        self.size = size
+        os.makedirs(self.directory, exist_ok=True)
+
+    def cache_path(self, path, file_size, mtime_ns):
+        key = f"{os.path.abspath(path)}|{file_size}|{mtime_ns}|{self.size}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jpg")
+
+    def load(self, path, file_size, mtime_ns):
+        """Return the thumbnail as a QImage, creating and caching it if needed"""
+        cache_path = self.cache_path(path, file_size, mtime_ns)
+        if os.path.exists(cache_path):
+            image = QImage(cache_path)
+            if not image.isNull():
+                return image
+
+        with Image.open(path) as img:
+            # JPEG decodes directly at a fraction of the size
+            img.draft("RGB", (self.size, self.size))
+            img = img.convert("RGB")
+            # Integer reduce is much cheaper than resampling the full image
+            factor = min(img.width // self.size, img.height // self.size)
+            if factor > 1:
+                img = img.reduce(factor)
+            img.thumbnail((self.size, self.size), Image.BILINEAR)
+            # Write under a private name and rename, so a concurrent load never reads a partial file
+            partial = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.part"
+            try:
+                img.save(partial, "JPEG", quality=85)
+                os.replace(partial, cache_path)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+            return QImage(cache_path)
+
+
+class ThumbnailSignals(QObject):
+    loaded = pyqtSignal(str, QImage)
+
+
+class ThumbnailLoader(QRunnable):
+    """Decode one thumbnail on the thread pool"""
+
+    def __init__(self, cache, signals, path, file_size, mtime_ns):
+        super().__init__()
+        self.cache = cache
+        self.signals = signals
+        self.path = path
+        self.file_size = file_size
+        self.mtime_ns = mtime_ns
+
+    def run(self):
+        try:
+            image = self.cache.load(self.path, self.file_size, self.mtime_ns)
+        except Exception as e:
+            print(f"Error loading thumbnail for {self.path}: {e}")
+            image = QImage()
+        try:
+            self.signals.loaded.emit(self.path, image)
+        except RuntimeError:
+            # The gallery was closed while this thumbnail was decoding
+            pass
+
+
+class GalleryModel(QAbstractListModel):
+    """Screenshots in a directory, newest first, with thumbnails loaded on demand"""
+
+    def __init__(self, cache=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache or ThumbnailCache()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(2, QThreadPool.globalInstance().maxThreadCount() - 1))
+        self.files = []
+        self.row_count = 0
+        self.rows = {}
+        # Least recently shown first
+        self.thumbnails = OrderedDict()
+        self.pending = set()
+        self.signals = ThumbnailSignals(self)
+        self.signals.loaded.connect(self.thumbnail_loaded)
+        self.placeholder = QPixmap(self.cache.size, self.cache.size)
+        self.placeholder.fill(QColor("#2d2d2d"))
+
+    def set_directory(self, directory):
+        self.beginResetModel()
+        self.cancel_pending()
+        files = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        stat = entry.stat()
+                        files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        except OSError as e:
+            print(f"Error listing {directory}: {e}")
+        files.sort(key=lambda f: f[2], reverse=True)
+        self.files = files
+        self.rows = {path: row for row, (path, _, _) in enumerate(files)}
+        self.row_count = min(PAGE_SIZE, len(files))
+        self.thumbnails = OrderedDict()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.row_count < len(self.files)
+
+    def fetchMore(self, parent):
+        count = min(PAGE_SIZE, len(self.files) - self.row_count)
+        self.beginInsertRows(QModelIndex(), self.row_count, self.row_count + count - 1)
+        self.row_count += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.row_count:
+            return None
+        path, file_size, mtime_ns = self.files[index.row()]
+        if role == Qt.DisplayRole:
+            return os.path.basename(path)
+        if role == Qt.ToolTipRole:
+            return path
+        if role == Qt.DecorationRole:
+            pixmap = self.thumbnails.get(path)
+            if pixmap is None:
+                # The view only asks for visible rows, so only those get decoded
+                self.request_thumbnail(path, file_size, mtime_ns)
+                return self.placeholder
+            self.thumbnails.move_to_end(path)
+            return pixmap
+        return None
+
+    def path(self, index):
+        return self.files[index.row()][0]
+
+    def request_thumbnail(self, path, file_size, mtime_ns):
+        if path in self.pending:
+            return
+        self.pending.add(path)
+        self.pool.start(ThumbnailLoader(self.cache, self.signals, path, file_size, mtime_ns))
+
+    def cancel_pending(self):
+        """Drop queued thumbnails, e.g. for rows that scrolled out of view"""
+        self.pool.clear()
+        self.pending.clear()
+
+    def thumbnail_loaded(self, path, image):
+        self.pending.discard(path)
+        row = self.rows.get(path)
+        if row is None or image.isNull():
+            return
+        self.thumbnails[path] = QPixmap.fromImage(image)
+        while len(self.thumbnails) > MAX_THUMBNAILS:
+            self.thumbnails.popitem(last=False)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+class GalleryDialog(QDialog):
+    # A double-clicked screenshot, for the app to show in its editor
+    open_requested = pyqtSignal(QImage)
+
+    def __init__(self, directory, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("🖼 Gallery")
+        self.resize(900, 650)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+
+        # Header with the current directory and a button to change it
+        header = QHBoxLayout()
+        self.directory_label = QLabel()
+        header.addWidget(self.directory_label, 1)
+        folder_btn = QPushButton("📂 Open Folder")
+        folder_btn.clicked.connect(self.choose_directory)
+        header.addWidget(folder_btn)
+        layout.addLayout(header)
+
+        self.model = GalleryModel(parent=self)
+        self.view = QListView()
+        self.view.setViewMode(QListView.IconMode)
+        self.view.setResizeMode(QListView.Adjust)
+        self.view.setMovement(QListView.Static)
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QListView.Batched)
+        self.view.setBatchSize(PAGE_SIZE)
+        self.view.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.view.setGridSize(QSize(THUMBNAIL_SIZE + 24, THUMBNAIL_SIZE + 36))
+        self.view.setSpacing(4)
+        self.view.setModel(self.model)
+        self.view.doubleClicked.connect(self.open_image)
+        self.view.verticalScrollBar().valueChanged.connect(self.model.cancel_pending)
+        layout.addWidget(self.view)
+
+        self.setStyleSheet("""
+            QDialog {
+                background: #1e1e1e;
+                color: white;
+            }
+            QLabel {
+                color: #aaa;
+                font-size: 13px;
+            }
+            QPushButton {
+                background: #3d3d3d;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                border-radius: 4px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background: #4d4d4d;
+            }
+            QListView {
+                background: #1e1e1e;
+                color: white;
+                border: none;
+            }
+            QListView::item:selected {
+                background: #0078d4;
+            }
+        """)
+
+        self.set_directory(directory)
+
+    def set_directory(self, directory):
+        self.directory = directory
+        self.directory_label.setText(directory)
+        self.model.set_directory(directory)
+
+    def choose_directory(self):
+        directory = QFileDialog.getExistingDirectory(self, "Open Folder", self.directory)
+        if directory:
+            self.set_directory(directory)
+
+    def open_image(self, index):
+        """Open the double-clicked screenshot in the editor"""
+        path = self.model.path(index)
+        image = QImage(path)
+        if image.isNull():
+            QMessageBox.warning(self, "Gallery", f"Could not open {path}")
+            return
+        self.open_requested.emit(image)
+
+    def closeEvent(self, event):
+        self.model.cancel_pending()
+        super().closeEvent(event)
@@ -0,0 +1,122 @@
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage
+
+# Default memory budget for the capture history (compressed bytes)
+DEFAULT_HISTORY_BUDGET = 256 * 1024 * 1024
+
+# Size of the thumbnails shown in the history menu
+THUMBNAIL_SIZE = 96
+
+
+class HistoryEntry:
+    """A single capture kept in the history"""
+
+    def __init__(self, entry_id, image):
+        self.entry_id = entry_id
+        self.timestamp = datetime.now()
+        self.width = image.width()
+        self.height = image.height()
+        self.bytes_per_line = image.bytesPerLine()
+        self.format = image.format()
+        self.thumbnail = image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE,
+                                      Qt.KeepAspectRatio, Qt.FastTransformation)
+        # Raw pixels are kept until the background compression finishes
+        self.raw = image.constBits().asstring(image.sizeInBytes())
+        self.data = None
+
+    @property
+    def nbytes(self):
+        """Bytes this entry currently occupies"""
+        if self.data is not None:
+            return len(self.data)
+        return len(self.raw)
+
+    def to_image(self):
+        """Rebuild a QImage that owns its pixel data"""
+        # Read raw first: compression sets data before dropping raw
+        raw = self.raw
+        if raw is None:
+            raw = zlib.decompress(self.data)
+        image = QImage(raw, self.width, self.height, self.bytes_per_line, self.format)
+        return image.copy()
+
+    def label(self):
+        return f"{self.timestamp.strftime('%H:%M:%S')}  —  {self.width}×{self.height}"
+
+
+class CaptureHistory:
+    """In-memory history of recent captures with a total byte budget.
+
+    Entries are compressed in a background thread and evicted in
+    least-recently-used order once the budget is exceeded.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_HISTORY_BUDGET, max_workers=1):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="history")
+
+    def add(self, image):
+        """Add a capture and schedule its compression, returns the entry id"""
+        with self._lock:
+            self._next_id += 1
+            entry = HistoryEntry(self._next_id, image)
+            self._entries[entry.entry_id] = entry
+            self._evict()
+        self._executor.submit(self._compress, entry)
+        return entry.entry_id
+
+    def _compress(self, entry):
+        # zlib releases the GIL, so this does not block the UI thread.
+        # Level 1 is several times faster than the default and still
+        # shrinks typical desktop captures by an order of magnitude.
+        data = zlib.compress(entry.raw, 1)
+        with self._lock:
+            entry.data = data
+            entry.raw = None
+            self._evict()
+
+    def _evict(self):
+        # Caller must hold the lock
+        total = sum(entry.nbytes for entry in self._entries.values())
+        while total > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
+
+    def entries(self):
+        """Return the entries, most recently used first"""
+        with self._lock:
+            return list(reversed(self._entries.values()))
+
+    def image(self, entry_id):
+        """Return the capture as a QImage and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(entry_id)
+        return entry.to_image()
+
+    def set_budget(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,150 @@
+"""Visual diff of two screenshots for regression checks.
+
+The difference is computed with NumPy a band of rows at a time, so huge
+captures never need a full-size temporary. Changed pixels are grouped into
+tiles and connected tiles become bounding boxes:
+
+    python image_diff.py before.png after.png --output diff.png --max-changed 0.001
+
+The exit code is 0 when at most --max-changed of the pixels differ, 1 when
+more do and 2 on errors, so the command can gate a test pipeline.
+"""
+import sys
+import json
+import argparse
+from collections import namedtuple
+import numpy as np
+
+# Per-channel difference a pixel needs to count as changed
+DEFAULT_THRESHOLD = 16
+DEFAULT_TILE = 16
+CHUNK_ROWS = 256
+OVERLAY_COLOR = (255, 0, 0)
+OVERLAY_ALPHA = 0.45
+
+DiffResult = namedtuple("DiffResult", ["mask", "boxes", "changed_pixels", "changed_fraction"])
+
+
+def load_image(path):
+    """Read an image as an RGB array"""
+    import cv2
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise IOError(f"Could not read {path}")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def diff_mask(before, after, threshold=DEFAULT_THRESHOLD, chunk_rows=CHUNK_ROWS):
+    """Boolean mask of pixels whose largest channel difference exceeds threshold.
+
+    Images of different sizes are compared on their overlap; everything
+    outside the overlap counts as changed.
+    """
+    height = max(before.shape[0], after.shape[0])
+    width = max(before.shape[1], after.shape[1])
+    mask = np.ones((height, width), dtype=bool)
+    overlap_h = min(before.shape[0], after.shape[0])
+    overlap_w = min(before.shape[1], after.shape[1])
+    for y in range(0, overlap_h, chunk_rows):
+        end = min(y + chunk_rows, overlap_h)
+        a = before[y:end, :overlap_w, :3].astype(np.int16)
+        b = after[y:end, :overlap_w, :3]
+        np.subtract(a, b, out=a)
+        np.abs(a, out=a)
+        mask[y:end, :overlap_w] = a.max(axis=2) > threshold
+    return mask
+
+
+def tile_mask(mask, tile):
+    """Reduce a pixel mask to a mask of tiles containing any changed pixel"""
+    height, width = mask.shape
+    rows, cols = -(-height // tile), -(-width // tile)
+    padded = np.zeros((rows * tile, cols * tile), dtype=bool)
+    padded[:height, :width] = mask
+    return padded.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+
+
+def bounding_boxes(mask, tile=DEFAULT_TILE):
+    """(x, y, width, height) boxes around connected changed tiles"""
+    import cv2
+    tiles = tile_mask(mask, tile).astype(np.uint8)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(tiles, connectivity=8)
+    height, width = mask.shape
+    boxes = []
+    # Label 0 is the unchanged background
+    for x, y, w, h, _ in stats[1:count]:
+        x, y = int(x) * tile, int(y) * tile
+        boxes.append((x, y, min(int(w) * tile, width - x), min(int(h) * tile, height - y)))
+    return boxes
+
+
+def compare_images(before, after, threshold=DEFAULT_THRESHOLD, tile=DEFAULT_TILE):
+    mask = diff_mask(before, after, threshold)
+    changed = int(np.count_nonzero(mask))
+    return DiffResult(mask, bounding_boxes(mask, tile) if changed else [], changed, changed / mask.size)
+
+
+def render_overlay(after, result, chunk_rows=CHUNK_ROWS):
+    """The after image with changed pixels tinted and boxes drawn around changes"""
+    import cv2
+    height, width = result.mask.shape
+    output = np.zeros((height, width, 3), dtype=np.uint8)
+    output[:after.shape[0], :after.shape[1]] = after[:, :, :3]
+    color = np.array(OVERLAY_COLOR, dtype=np.float32)
+    for y in range(0, height, chunk_rows):
+        band = output[y:y + chunk_rows]
+        changed = result.mask[y:y + chunk_rows]
+        band[changed] = (band[changed] * (1 - OVERLAY_ALPHA) + color * OVERLAY_ALPHA).astype(np.uint8)
+    for x, y, w, h in result.boxes:
+        cv2.rectangle(output, (x, y), (x + w - 1, y + h - 1), OVERLAY_COLOR, 2)
+    return output
+
+
+def mask_to_rgba(mask):
+    """Translucent overlay layer with the changed pixels coloured in"""
+    layer = np.zeros(mask.shape + (4,), dtype=np.uint8)
+    layer[mask] = OVERLAY_COLOR + (int(255 * OVERLAY_ALPHA),)
+    return layer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two screenshots")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD,
+                        help="Per-channel difference that counts as a change")
+    parser.add_argument("--tile", type=int, default=DEFAULT_TILE, help="Tile size for grouping changes")
+    parser.add_argument("--max-changed", type=float, default=0.0,
+                        help="Fraction of changed pixels that still passes")
+    parser.add_argument("--output", help="Write the highlighted diff image here")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        before = load_image(args.before)
+        after = load_image(args.after)
+        result = compare_images(before, after, args.threshold, args.tile)
+        if args.output:
+            import cv2
+            overlay = render_overlay(after, result)
+            if not cv2.imwrite(args.output, cv2.cvtColor(overlay, cv2.COLOR_RGB2BGR)):
+                raise IOError(f"Could not write {args.output}")
+    except Exception as e:
+        print(f"Error comparing images: {e}", file=sys.stderr)
+        return 2
+
+    passed = result.changed_fraction <= args.max_changed
+    if args.json:
+        print(json.dumps({"changed_pixels": result.changed_pixels,
+                          "changed_fraction": result.changed_fraction,
+                          "boxes": result.boxes, "passed": passed}))
+    else:
+        print(f"{result.changed_pixels} pixels changed ({result.changed_fraction * 100:.3f}%) "
+              f"in {len(result.boxes)} regions")
+        for x, y, w, h in result.boxes:
+            print(f"  {x},{y} {w}x{h}")
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import os
+import numpy as np
+from PyQt5.QtGui import QImage
+
+
+def qimage_to_array(image):
+    """Return the pixels of a QImage as an RGB numpy array (height, width, 3)"""
+    if image.format() != QImage.Format_RGB888:
+        image = image.convertToFormat(QImage.Format_RGB888)
+    width, height = image.width(), image.height()
+    bytes_per_line = image.bytesPerLine()
+    buffer = image.constBits().asstring(image.sizeInBytes())
+    # Rows may be padded to a 4 byte boundary, so slice the padding off
+    array = np.frombuffer(buffer, dtype=np.uint8).reshape(height, bytes_per_line)
+    return array[:, :width * 3].reshape(height, width, 3)
+
+
+def array_to_qimage(array):
+    """Create a QImage that owns a copy of an RGB numpy array"""
+    array = np.ascontiguousarray(array)
+    height, width = array.shape[:2]
+    image = QImage(array.data, width, height, width * 3, QImage.Format_RGB888)
+    return image.copy()
+
+
+# Qt image format names by file extension
+IMAGE_FORMATS = {
+    ".png": "PNG",
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+    ".webp": "WEBP",
+    ".bmp": "BMP",
+}
+
+
+# zlib level for screenshots saved from the editor
+DEFAULT_PNG_COMPRESSION = 6
+
+# Compressed PNGs with at least this many pixels are encoded on all cores by png_writer
+PARALLEL_PNG_PIXELS = 3840 * 2160
+
+
+def png_compression_level(quality):
+    """zlib level for a Qt PNG quality, as Qt maps it: 100 is uncompressed, 0 is level 9"""
+    return (100 - max(0, min(100, quality))) * 9 // 91
+
+
+def qimage_to_png_array(image):
+    """RGB or, if the image has any transparency, RGBA pixels of a QImage"""
+    if not image.hasAlphaChannel():
+        return qimage_to_array(image)
+    if image.format() != QImage.Format_RGBA8888:
+        image = image.convertToFormat(QImage.Format_RGBA8888)
+    width, height = image.width(), image.height()
+    buffer = image.constBits().asstring(image.sizeInBytes())
+    array = np.frombuffer(buffer, dtype=np.uint8).reshape(height, image.bytesPerLine())
+    array = array[:, :width * 4].reshape(height, width, 4)
+    # Rendered scenes carry an alpha channel even when they are fully opaque
+    if (array[:, :, 3] == 255).all():
+        return array[:, :, :3]
+    return array
+
+
+def save_image(image, filename, quality=100, compression=None, workers=None):
+    """Encode a QImage or QPixmap to disk, the format follows the extension.
+
+    compression is the zlib level for PNGs and defaults to the level Qt
+    derives from quality; workers limits the threads of large PNG encodes.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    image_format = IMAGE_FORMATS.get(extension, "JPEG")
+    if image_format == "PNG":
+        level = png_compression_level(quality) if compression is None else compression
+        # Uncompressed PNGs are bound by memory and disk, not by the encoder, and on
+        # a single core Qt's libpng is faster than filtering with NumPy
+        if (level > 0 and (workers or os.cpu_count() or 1) > 1
+                and image.width() * image.height() >= PARALLEL_PNG_PIXELS):
+            from png_writer import write_png
+            if hasattr(image, "toImage"):
+                image = image.toImage()
+            try:
+                write_png(filename, qimage_to_png_array(image), level, workers)
+            except OSError as e:
+                raise IOError(f"Could not write {filename}: {e}")
+            return
+        # Qt's quality runs the other way round from the zlib level
+        quality = 100 - (level * 91 + 8) // 9
+    if not image.save(filename, image_format, quality):
+        raise IOError(f"Could not write {filename}")
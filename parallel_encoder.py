@@ -0,0 +1,186 @@
+"""Segment-parallel video encoding across CPU cores.
+
+SegmentedEncoder can be used in place of cv2.VideoWriter. Frames are copied
+into shared memory blocks of a fixed number of frames; every full block is
+encoded to its own segment file by a worker process, and the segments are
+joined into the final file on release(). All encoders share one pool of
+worker processes, and the shared memory of the blocks being filled or
+encoded stays within MAX_SHARED_BYTES. The module avoids importing Qt so
+worker processes start quickly.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+# Shared memory per segment; the frame count follows from the frame size
+SEGMENT_BYTES = 128 * 1024 * 1024
+# Shared memory of all segments being filled or encoded at once, whatever the worker count
+MAX_SHARED_BYTES = 512 * 1024 * 1024
+MIN_SEGMENT_FRAMES = 8
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def shared_pool(workers):
+    """Worker processes shared by all encoders, so a new segment writer does not spawn new ones"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        # A pool whose worker died cannot take new work
+        if _pool is None or _pool_workers != workers or getattr(_pool, "_broken", False):
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawn rather than fork: the recorder runs inside a threaded Qt app
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _encode_segment(shm_name, count, shape, fps, path, fourcc):
+    """Worker: encode count frames from a shared memory block"""
+    import cv2
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        frames = np.ndarray((count,) + shape, dtype=np.uint8, buffer=shm.buf)
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (shape[1], shape[0]))
+        for frame in frames:
+            out.write(frame)
+        out.release()
+        del frames
+    finally:
+        shm.close()
+    return path
+
+
+def concat_segments(paths, target, fps, size, fourcc='mp4v'):
+    """Join segment files, without re-encoding when ffmpeg is available"""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        list_file = target + ".segments.txt"
+        with open(list_file, "w") as f:
+            for path in paths:
+                f.write(f"file '{path}'\n")
+        try:
+            subprocess.run([ffmpeg, "-v", "error", "-y", "-f", "concat", "-safe", "0",
+                            "-i", list_file, "-c", "copy", target],
+                           check=True, capture_output=True)
+        finally:
+            os.remove(list_file)
+        return
+
+    # Without ffmpeg the segments have to be decoded and encoded once more
+    import cv2
+    print("ffmpeg not found, re-encoding segments to join them")
+    out = cv2.VideoWriter(target, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    for path in paths:
+        capture = cv2.VideoCapture(path)
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            out.write(frame)
+        capture.release()
+    out.release()
+
+
+class SegmentedEncoder:
+    """Encode BGR frames in parallel segments, with the cv2.VideoWriter interface"""
+
+    def __init__(self, target, fps, size, workers=None, fourcc='mp4v', segment_bytes=SEGMENT_BYTES,
+                 max_shared_bytes=MAX_SHARED_BYTES):
+        self.target = target
+        self.fps = fps
+        self.size = size
+        self.fourcc = fourcc
+        self.shape = (size[1], size[0], 3)
+        frame_bytes = size[0] * size[1] * 3
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        # Smaller segments on many cores, so a segment per worker plus the one filling fit the budget
+        segment_bytes = min(segment_bytes, max_shared_bytes // (self.workers + 1))
+        self.segment_frames = max(MIN_SEGMENT_FRAMES, segment_bytes // frame_bytes)
+        self.block_bytes = self.segment_frames * frame_bytes
+        self.max_shared_bytes = max_shared_bytes
+        self.executor = shared_pool(self.workers)
+        self.segment_dir = tempfile.mkdtemp(prefix="segments_")
+        self.segments = []
+        self.in_flight = []
+        self.block = None
+        self.shm = None
+        self.count = 0
+
+    @staticmethod
+    def available():
+        """Joining segments without re-encoding needs ffmpeg"""
+        return shutil.which("ffmpeg") is not None
+
+    def isOpened(self):
+        return True
+
+    def _new_block(self):
+        self.shm = shared_memory.SharedMemory(create=True, size=self.segment_frames * self.shape[0]
+                                              * self.shape[1] * self.shape[2])
+        self.block = np.ndarray((self.segment_frames,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.count = 0
+
+    def _submit_block(self):
+        path = os.path.join(self.segment_dir, f"segment_{len(self.segments):05d}.mp4")
+        shm = self.shm
+        self.block = None
+        self.shm = None
+        try:
+            future = self.executor.submit(_encode_segment, shm.name, self.count, self.shape,
+                                          self.fps, path, self.fourcc)
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+        self.segments.append(path)
+        self.in_flight.append((future, shm))
+        # Bound memory: wait for the oldest segment when every worker is busy or the next
+        # block would take the shared memory over budget
+        while self.in_flight and (len(self.in_flight) > self.workers
+                                  or (len(self.in_flight) + 1) * self.block_bytes > self.max_shared_bytes):
+            self._finish_oldest()
+
+    def _finish_oldest(self):
+        future, shm = self.in_flight.pop(0)
+        try:
+            future.result()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def write(self, frame):
+        if self.block is None:
+            self._new_block()
+        self.block[self.count] = frame
+        self.count += 1
+        if self.count == self.segment_frames:
+            self._submit_block()
+
+    def release(self):
+        """Encode the remaining frames and join all segments into the target"""
+        try:
+            if self.block is not None and self.count:
+                self._submit_block()
+            elif self.shm is not None:
+                self.block = None
+                self.shm.close()
+                self.shm.unlink()
+            while self.in_flight:
+                self._finish_oldest()
+            if self.segments:
+                concat_segments(self.segments, self.target, self.fps, self.size, self.fourcc)
+        finally:
+            for _, shm in self.in_flight:
+                shm.close()
+                shm.unlink()
+            self.in_flight = []
+            shutil.rmtree(self.segment_dir, ignore_errors=True)
@@ -0,0 +1,87 @@
+"""Simplification of freehand strokes while they are being drawn.
+
+Points closer than a minimum distance to the previous one are dropped as
+they arrive. The remaining points collect in a short tail that is
+simplified with Ramer-Douglas-Peucker whenever it reaches a window size,
+so the work per mouse move stays constant however long the stroke gets
+and the finished path is never further than the tolerance from the input.
+"""
+import numpy as np
+
+# Scene pixels a point must move before it is recorded
+MIN_DISTANCE = 2.0
+# Largest distance of a dropped point from the simplified stroke
+TOLERANCE = 0.75
+# Tail length at which the tail is simplified and committed
+WINDOW = 32
+
+
+def simplify(points, tolerance=TOLERANCE):
+    """Ramer-Douglas-Peucker on a list of (x, y) points, returns the kept points"""
+    if len(points) < 3:
+        return list(points)
+    coords = np.asarray(points, dtype=np.float64)
+    keep = np.zeros(len(coords), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = coords[first], coords[last]
+        inner = coords[first + 1:last]
+        dx, dy = end - start
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(*(inner - start).T)
+        else:
+            # Perpendicular distance to the chord from start to end
+            distances = np.abs(dx * (inner[:, 1] - start[1]) - dy * (inner[:, 0] - start[0])) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return [points[i] for i in np.flatnonzero(keep)]
+
+
+class StrokeSimplifier:
+    """Collects the points of one stroke and simplifies them incrementally.
+
+    points holds the committed, simplified points and tail the recent raw
+    points after the last committed one; add() returns the newly committed
+    points so a caller can extend its path instead of rebuilding it.
+    """
+
+    def __init__(self, start, tolerance=TOLERANCE, min_distance=MIN_DISTANCE, window=WINDOW):
+        self.tolerance = tolerance
+        self.min_distance = min_distance
+        self.window = window
+        self.points = [start]
+        self.tail = []
+
+    def _last(self):
+        return self.tail[-1] if self.tail else self.points[-1]
+
+    def add(self, point):
+        """Record a point, returns the points committed by it (often none)"""
+        last = self._last()
+        if (point[0] - last[0]) ** 2 + (point[1] - last[1]) ** 2 < self.min_distance ** 2:
+            return []
+        self.tail.append(point)
+        if len(self.tail) < self.window:
+            return []
+        return self._commit()
+
+    def _commit(self):
+        committed = simplify([self.points[-1]] + self.tail, self.tolerance)[1:]
+        self.points.extend(committed)
+        self.tail = []
+        return committed
+
+    def finish(self, point=None):
+        """Record the final point and commit the tail, returns the newly committed points"""
+        if point is not None and point != self._last():
+            self.tail.append(point)
+        return self._commit() if self.tail else []
@@ -0,0 +1,240 @@
+"""Perceptual hashes and an on-disk index for finding near-duplicate captures.
+
+The index lives next to the screenshots in ``.screenshot_index.npz`` and maps
+each file name and mtime to its dHash and pHash, so similarity queries never
+have to decode an image again.
+
+Usage:
+    python phash.py index DIRECTORY
+    python phash.py similar DIRECTORY IMAGE [--max-distance N]
+    python phash.py duplicates DIRECTORY [--max-distance N]
+"""
+import os
+import sys
+import argparse
+import numpy as np
+from PIL import Image
+
+INDEX_FILENAME = ".screenshot_index.npz"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
+# Hamming distance (out of 64 bits) at or below which two captures are
+# considered near-duplicates
+DEFAULT_MAX_DISTANCE = 4
+
+# Number of set bits for every byte value, used to popcount hash arrays
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def _pack_bits(bits):
+    """Pack a boolean array of 64 bits into an unsigned 64 bit integer"""
+    return np.packbits(bits.ravel()).view(">u8")[0].astype(np.uint64)
+
+
+def _grayscale(image):
+    """Return a PIL grayscale image from a PIL image or an RGB array"""
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    if image.mode != "L":
+        image = image.convert("L")
+    return image
+
+
+def dhash(image):
+    """Difference hash: compares horizontally adjacent pixels of a 9x8 thumbnail"""
+    small = np.asarray(_grayscale(image).resize((9, 8), Image.BOX), dtype=np.int16)
+    return _pack_bits(small[:, 1:] > small[:, :-1])
+
+
+def phash(image):
+    """DCT hash: compares the low frequencies of a 32x32 thumbnail to their median"""
+    small = np.asarray(_grayscale(image).resize((32, 32), Image.BOX), dtype=np.float64)
+    low = (_DCT_32 @ small @ _DCT_32.T)[:8, :8]
+    return _pack_bits(low > np.median(low.ravel()[1:]))
+
+
+def image_hashes(image):
+    """Return (dhash, phash) for a PIL image or an RGB array"""
+    gray = _grayscale(image)
+    return dhash(gray), phash(gray)
+
+
+def file_hashes(path):
+    """Decode an image file at reduced size and return its hashes"""
+    with Image.open(path) as image:
+        # JPEG can decode straight to a smaller grayscale image
+        image.draft("L", (64, 64))
+        image = image.convert("L")
+        # Shrink large captures before the box filters run
+        factor = min(image.width // 64, image.height // 64)
+        if factor > 1:
+            image = image.reduce(factor)
+        return image_hashes(image)
+
+
+def hamming_distance(hashes, value):
+    """Vectorized Hamming distance between an array of hashes and one hash"""
+    diff = np.bitwise_xor(np.asarray(hashes, dtype=np.uint64), np.uint64(value))
+    return _POPCOUNT[diff.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class PerceptualIndex:
+    """Hashes of every image in a directory, keyed by file name and mtime"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, INDEX_FILENAME)
+        self.names = np.empty(0, dtype=str)
+        self.mtimes = np.empty(0, dtype=np.float64)
+        self.dhashes = np.empty(0, dtype=np.uint64)
+        self.phashes = np.empty(0, dtype=np.uint64)
+        self.load()
+
+    def __len__(self):
+        return len(self.names)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                self.names = data["names"]
+                self.mtimes = data["mtimes"]
+                self.dhashes = data["dhashes"]
+                self.phashes = data["phashes"]
+        except Exception as e:
+            # A corrupt index is rebuilt from scratch on the next refresh
+            print(f"Error loading hash index: {e}")
+
+    def save(self):
+        temp_path = self.path + ".tmp.npz"
+        np.savez(temp_path, names=self.names, mtimes=self.mtimes,
+                 dhashes=self.dhashes, phashes=self.phashes)
+        os.replace(temp_path, self.path)
+
+    def _keep(self, mask):
+        self.names = self.names[mask]
+        self.mtimes = self.mtimes[mask]
+        self.dhashes = self.dhashes[mask]
+        self.phashes = self.phashes[mask]
+
+    def prune(self):
+        """Drop entries whose file was removed or modified, returns the count"""
+        if not len(self):
+            return 0
+        current = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file():
+                    current[entry.name] = entry.stat().st_mtime
+        keep = np.array([current.get(name) == mtime
+                         for name, mtime in zip(self.names, self.mtimes)], dtype=bool)
+        self._keep(keep)
+        return int((~keep).sum())
+
+    def add(self, name, mtime, hashes):
+        """Add or replace the entry for a file"""
+        self.add_many([(name, mtime, hashes)])
+
+    def add_many(self, entries):
+        """Add or replace (name, mtime, hashes) entries, copying the arrays once"""
+        if not entries:
+            return
+        names, mtimes, hashes = zip(*entries)
+        self._keep(~np.isin(self.names, names))
+        self.names = np.concatenate([self.names, np.array(names, dtype=str)])
+        self.mtimes = np.concatenate([self.mtimes, np.array(mtimes, dtype=np.float64)])
+        self.dhashes = np.concatenate([self.dhashes, np.array([h[0] for h in hashes], dtype=np.uint64)])
+        self.phashes = np.concatenate([self.phashes, np.array([h[1] for h in hashes], dtype=np.uint64)])
+
+    def add_file(self, path, hashes=None):
+        """Index a file in this directory, decoding it only if no hashes are given"""
+        if hashes is None:
+            hashes = file_hashes(path)
+        self.add(os.path.basename(path), os.stat(path).st_mtime, hashes)
+
+    def refresh(self):
+        """Bring the index up to date with the directory, returns files hashed"""
+        self.prune()
+        indexed = set(self.names.tolist())
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if (entry.is_file() and entry.name not in indexed
+                        and entry.name.lower().endswith(IMAGE_EXTENSIONS)):
+                    try:
+                        entries.append((entry.name, entry.stat().st_mtime, file_hashes(entry.path)))
+                    except Exception as e:
+                        print(f"Error hashing {entry.path}: {e}")
+        self.add_many(entries)
+        return len(entries)
+
+    def find_similar(self, hashes, max_distance=DEFAULT_MAX_DISTANCE, use_phash=False):
+        """Return (name, distance) pairs within max_distance, closest first"""
+        if not len(self):
+            return []
+        if use_phash:
+            distances = hamming_distance(self.phashes, hashes[1])
+        else:
+            distances = hamming_distance(self.dhashes, hashes[0])
+        matches = np.flatnonzero(distances <= max_distance)
+        matches = matches[np.argsort(distances[matches], kind="stable")]
+        return [(str(self.names[i]), int(distances[i])) for i in matches]
+
+    def duplicate_groups(self, max_distance=DEFAULT_MAX_DISTANCE):
+        """Group indexed files whose dHash is within max_distance of each other"""
+        groups = []
+        assigned = np.zeros(len(self), dtype=bool)
+        for i in range(len(self)):
+            if assigned[i]:
+                continue
+            close = (hamming_distance(self.dhashes, self.dhashes[i]) <= max_distance) & ~assigned
+            if close.sum() > 1:
+                groups.append([str(name) for name in self.names[close]])
+            assigned |= close
+        return groups
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find near-duplicate screenshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    index_parser = subparsers.add_parser("index", help="Build or update the index")
+    index_parser.add_argument("directory")
+    similar_parser = subparsers.add_parser("similar", help="List files similar to an image")
+    similar_parser.add_argument("directory")
+    similar_parser.add_argument("image")
+    similar_parser.add_argument("--max-distance", type=int, default=DEFAULT_MAX_DISTANCE)
+    similar_parser.add_argument("--phash", action="store_true", help="Compare pHashes instead of dHashes")
+    duplicates_parser = subparsers.add_parser("duplicates", help="List groups of near-duplicates")
+    duplicates_parser.add_argument("directory")
+    duplicates_parser.add_argument("--max-distance", type=int, default=DEFAULT_MAX_DISTANCE)
+    args = parser.parse_args(argv)
+
+    index = PerceptualIndex(args.directory)
+    hashed = index.refresh()
+    index.save()
+
+    if args.command == "index":
+        print(f"Indexed {len(index)} images ({hashed} new)")
+    elif args.command == "similar":
+        for name, distance in index.find_similar(file_hashes(args.image), args.max_distance, args.phash):
+            print(f"{distance:3d}  {name}")
+    elif args.command == "duplicates":
+        for group in index.duplicate_groups(args.max_distance):
+            print("  ".join(group))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
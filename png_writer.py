@@ -0,0 +1,195 @@
+"""Multi-threaded PNG encoder for very large images.
+
+The rows are split into bands that are filtered and deflated on a thread
+pool, the way pigz compresses a gzip stream: every band is compressed as
+raw deflate ending in a sync flush, primed with the last 32 KiB of the
+band before it, so the bands simply concatenate into one zlib stream that
+compresses about as well as a single-threaded encode. The per-band Adler-32
+checksums are combined for the stream trailer. zlib and most NumPy
+operations release the GIL, so the bands really run in parallel.
+
+    python png_writer.py in.png out.png --level 6
+"""
+import os
+import sys
+import zlib
+import struct
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+COLOR_TYPES = {3: 2, 4: 6}  # Channels to PNG color type, RGB and RGBA
+DEFAULT_LEVEL = 6
+# Uncompressed bytes per band, big enough that priming costs little
+BAND_BYTES = 1 << 20
+WINDOW = 32 * 1024
+ADLER_BASE = 65521
+
+FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE, FILTER_PAETH = range(5)
+
+
+def adler32_combine(adler1, adler2, length2):
+    """Adler-32 of two concatenated buffers from their checksums, as zlib's adler32_combine"""
+    remainder = length2 % ADLER_BASE
+    sum1 = adler1 & 0xFFFF
+    sum2 = (remainder * sum1) % ADLER_BASE
+    sum1 = (sum1 + (adler2 & 0xFFFF) + ADLER_BASE - 1) % ADLER_BASE
+    sum2 = (sum2 + (adler1 >> 16) + (adler2 >> 16) + ADLER_BASE - remainder) % ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+
+def _paeth(left, up, up_left):
+    # Distances of the estimate left + up - up_left, rearranged as libpng does
+    up_delta = np.subtract(up, up_left, dtype=np.int16)
+    left_delta = np.subtract(left, up_left, dtype=np.int16)
+    distance_left = np.abs(up_delta)
+    distance_up = np.abs(left_delta)
+    distance_up_left = np.abs(up_delta + left_delta)
+    return np.where((distance_left <= distance_up) & (distance_left <= distance_up_left), left,
+                    np.where(distance_up <= distance_up_left, up, up_left))
+
+
+# Every Nth byte of a row is used to pick its filter; odd, so all channels are sampled
+SAMPLE_STEP = 7
+
+
+def _apply_filter(kind, rows, left, above, above_left):
+    # uint8 arithmetic wraps modulo 256, which is what PNG filters want
+    if kind == FILTER_NONE:
+        return rows
+    if kind == FILTER_SUB:
+        return rows - left
+    if kind == FILTER_UP:
+        return rows - above
+    if kind == FILTER_AVERAGE:
+        return rows - ((left.astype(np.uint16) + above) >> 1).astype(np.uint8)
+    return rows - _paeth(left, above, above_left)
+
+
+def filter_rows(rows, previous, channels):
+    """Filter a band of rows, each prefixed with its filter type byte.
+
+    rows is (height, width * channels) uint8 and previous the row above the
+    band, or None for the first band. Every row gets the filter whose output
+    has the smallest sum of absolute values, the heuristic libpng uses,
+    estimated from a sample of the row's bytes.
+    """
+    height, stride = rows.shape
+    above = np.empty_like(rows)
+    above[0] = previous if previous is not None else 0
+    above[1:] = rows[:-1]
+    left = np.zeros_like(rows)
+    left[:, channels:] = rows[:, :-channels]
+    above_left = np.zeros_like(rows)
+    above_left[:, channels:] = above[:, :-channels]
+
+    sample = np.s_[:, ::SAMPLE_STEP]
+    costs = []
+    for kind in range(5):
+        filtered = _apply_filter(kind, rows[sample], left[sample], above[sample], above_left[sample])
+        # Bytes as signed values, so small negative differences count as small
+        costs.append(np.abs(filtered.view(np.int8).astype(np.int16)).sum(axis=1))
+    choice = np.argmin(costs, axis=0)
+
+    output = np.empty((height, stride + 1), dtype=np.uint8)
+    output[:, 0] = choice
+    for kind in np.unique(choice):
+        selected = choice == kind
+        output[selected, 1:] = _apply_filter(kind, rows[selected], left[selected], above[selected],
+                                             above_left[selected])
+    return output.tobytes()
+
+
+def _encode_band(pixels, start, end, level, channels):
+    """Filter rows start..end, returns (filtered bytes, adler32)"""
+    # Copying band by band keeps strided views, e.g. RGB out of RGBA, cheap
+    rows = np.ascontiguousarray(pixels[start:end]).reshape(end - start, -1)
+    previous = pixels[start - 1].reshape(-1) if start > 0 else None
+    if level == 0:
+        # Filtering cannot help stored blocks
+        data = np.empty((end - start, rows.shape[1] + 1), dtype=np.uint8)
+        data[:, 0] = FILTER_NONE
+        data[:, 1:] = rows
+        data = data.tobytes()
+    else:
+        data = filter_rows(rows, previous, channels)
+    return data, zlib.adler32(data)
+
+
+def _deflate_band(data, dictionary, level, last):
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    # A sync flush ends the band on a byte boundary so the next one can follow it
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _zlib_header(level):
+    flevel = 0 if level < 2 else 1 if level < 6 else 2 if level == 6 else 3
+    cmf = 0x78  # Deflate with a 32 KiB window
+    flg = flevel << 6
+    flg |= 31 - ((cmf << 8) | flg) % 31
+    return bytes([cmf, flg])
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)))
+
+
+def write_png(path, pixels, level=DEFAULT_LEVEL, workers=None, band_bytes=BAND_BYTES):
+    """Write an RGB or RGBA uint8 array (height, width, channels) as a PNG file"""
+    height, width, channels = pixels.shape
+    if channels not in COLOR_TYPES:
+        raise ValueError(f"Expected 3 or 4 channels, got {channels}")
+    if pixels.dtype != np.uint8:
+        raise ValueError(f"Expected uint8 pixels, got {pixels.dtype}")
+    rows_per_band = max(1, band_bytes // (width * channels + 1))
+    bands = [(start, min(start + rows_per_band, height)) for start in range(0, height, rows_per_band)]
+    workers = workers or os.cpu_count() or 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        filtered = list(executor.map(lambda band: _encode_band(pixels, band[0], band[1], level, channels), bands))
+        compressed = executor.map(
+            lambda i: _deflate_band(filtered[i][0], filtered[i - 1][0][-WINDOW:] if i else None,
+                                    level, i == len(bands) - 1),
+            range(len(bands)))
+
+        checksum = 1
+        with open(path, "wb") as f:
+            f.write(PNG_SIGNATURE)
+            f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, COLOR_TYPES[channels], 0, 0, 0)))
+            f.write(_chunk(b"IDAT", _zlib_header(level)))
+            for (data, adler), band in zip(filtered, compressed):
+                checksum = adler32_combine(checksum, adler, len(data))
+                f.write(_chunk(b"IDAT", band))
+            f.write(_chunk(b"IDAT", struct.pack(">I", checksum)))
+            f.write(_chunk(b"IEND", b""))
+
+
+def main(argv=None):
+    import time
+    import cv2
+    parser = argparse.ArgumentParser(description="Re-encode an image as PNG on all cores")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--level", type=int, default=DEFAULT_LEVEL, choices=range(10))
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    image = cv2.imread(args.input, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        print(f"Could not read {args.input}", file=sys.stderr)
+        return 1
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    pixels = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA if image.shape[2] == 4 else cv2.COLOR_BGR2RGB)
+    start = time.perf_counter()
+    write_png(args.output, pixels, args.level, args.workers)
+    print(f"Wrote {args.output} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
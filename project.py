@@ -0,0 +1,144 @@
+"""Re-editable screenshot projects.
+
+A project is a small JSON sidecar, NAME.ssproj, next to the original
+capture, NAME.ssproj.png, which is written once. The sidecar lists the
+annotations as plain data, so saving an edit rewrites a few kilobytes
+instead of encoding the whole screenshot again, and opening a project can
+show the annotations before the image has been decoded.
+"""
+import os
+import json
+from PyQt5.QtCore import Qt, QObject, QRunnable, QPointF, QRectF, pyqtSignal
+from PyQt5.QtGui import QImage, QColor, QPen, QFont, QPainterPath
+from PyQt5.QtWidgets import QGraphicsPathItem, QGraphicsRectItem, QGraphicsTextItem
+
+PROJECT_EXTENSION = ".ssproj"
+PROJECT_VERSION = 1
+
+
+def project_image_path(project_path):
+    """The original capture stored alongside a project"""
+    return project_path + ".png"
+
+
+def _path_to_data(path):
+    elements = []
+    for i in range(path.elementCount()):
+        element = path.elementAt(i)
+        elements.append([int(element.type), round(element.x, 2), round(element.y, 2)])
+    return elements
+
+
+def _data_to_path(elements):
+    path = QPainterPath()
+    curve = []
+    for kind, x, y in elements:
+        point = QPointF(x, y)
+        if kind == QPainterPath.MoveToElement:
+            path.moveTo(point)
+        elif kind == QPainterPath.LineToElement:
+            path.lineTo(point)
+        else:
+            # A curve is one CurveToElement followed by two CurveToDataElements
+            curve.append(point)
+            if len(curve) == 3:
+                path.cubicTo(*curve)
+                curve = []
+    return path
+
+
+def serialize_item(item):
+    """Plain data for an annotation item, or None for items that are not saved"""
+    if isinstance(item, QGraphicsPathItem):
+        pen = item.pen()
+        return {"type": "path", "color": pen.color().name(QColor.HexArgb), "width": pen.widthF(),
+                "cap": int(pen.capStyle()), "join": int(pen.joinStyle()),
+                "pos": [item.pos().x(), item.pos().y()], "path": _path_to_data(item.path())}
+    if isinstance(item, QGraphicsRectItem):
+        pen = item.pen()
+        rect = item.rect()
+        return {"type": "rect", "color": pen.color().name(QColor.HexArgb), "width": pen.widthF(),
+                "pos": [item.pos().x(), item.pos().y()],
+                "rect": [rect.x(), rect.y(), rect.width(), rect.height()]}
+    if isinstance(item, QGraphicsTextItem):
+        return {"type": "text", "text": item.toPlainText(), "color": item.defaultTextColor().name(QColor.HexArgb),
+                "font": item.font().toString(), "pos": [item.pos().x(), item.pos().y()]}
+    return None
+
+
+def deserialize_item(data):
+    """Create the annotation item described by serialize_item()"""
+    if data["type"] == "path":
+        item = QGraphicsPathItem(_data_to_path(data["path"]))
+        pen = QPen(QColor(data["color"]), data["width"])
+        # Freehand strokes use round caps and joins
+        pen.setCapStyle(data.get("cap", Qt.SquareCap))
+        pen.setJoinStyle(data.get("join", Qt.BevelJoin))
+        item.setPen(pen)
+    elif data["type"] == "rect":
+        item = QGraphicsRectItem(QRectF(*data["rect"]))
+        item.setPen(QPen(QColor(data["color"]), data["width"]))
+    elif data["type"] == "text":
+        item = QGraphicsTextItem(data["text"])
+        item.setDefaultTextColor(QColor(data["color"]))
+        font = QFont()
+        font.fromString(data["font"])
+        item.setFont(font)
+    else:
+        raise ValueError(f"Unknown annotation type: {data['type']}")
+    item.setPos(*data["pos"])
+    return item
+
+
+def save_project(path, items, size, image=None):
+    """Write the annotation sidecar, and the original image if it is given"""
+    if image is not None:
+        image_path = project_image_path(path)
+        partial = image_path + ".part.png"
+        # Lossless and compressed, the original is only written once
+        if not image.save(partial, "PNG", 50):
+            raise IOError(f"Could not write {image_path}")
+        os.replace(partial, image_path)
+    annotations = [data for data in (serialize_item(item) for item in items) if data is not None]
+    project = {
+        "version": PROJECT_VERSION,
+        "image": os.path.basename(project_image_path(path)),
+        "size": list(size),
+        "annotations": annotations,
+    }
+    partial = path + ".part"
+    with open(partial, "w") as f:
+        json.dump(project, f, separators=(",", ":"))
+    os.replace(partial, path)
+
+
+def load_project(path):
+    """Read a project sidecar; returns (image path, size, annotation items)"""
+    with open(path) as f:
+        project = json.load(f)
+    if project.get("version", 0) > PROJECT_VERSION:
+        raise ValueError(f"{path} was saved by a newer version")
+    image_path = os.path.join(os.path.dirname(path), project["image"])
+    items = [deserialize_item(data) for data in project["annotations"]]
+    return image_path, tuple(project["size"]), items
+
+
+class ImageLoadSignals(QObject):
+    loaded = pyqtSignal(str, QImage)
+
+
+class ImageLoader(QRunnable):
+    """Decodes a project image on the thread pool"""
+
+    def __init__(self, path, signals):
+        super().__init__()
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        image = QImage(self.path)
+        try:
+            self.signals.loaded.emit(self.path, image)
+        except RuntimeError:
+            # The editor was closed while the image was loading
+            pass
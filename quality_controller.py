@@ -0,0 +1,174 @@
+import os
+import shutil
+from collections import deque, namedtuple
+
+QualityLevel = namedtuple("QualityLevel", ["fps", "scale"])
+
+# From best to cheapest; each step lowers either the frame rate or the scale
+DEFAULT_LEVELS = (
+    QualityLevel(30.0, 1.0),
+    QualityLevel(24.0, 1.0),
+    QualityLevel(20.0, 1.0),
+    QualityLevel(15.0, 1.0),
+    QualityLevel(15.0, 0.75),
+    QualityLevel(10.0, 0.75),
+    QualityLevel(10.0, 0.5),
+)
+
+
+def levels_for_fps(fps, levels=DEFAULT_LEVELS):
+    """The levels at or below a target frame rate, best first"""
+    capped = [level for level in levels if level.fps <= fps]
+    if not capped or capped[0].fps < fps:
+        capped.insert(0, QualityLevel(float(fps), 1.0))
+    return tuple(capped)
+
+
+class AdaptiveQualityController:
+    """Lowers and raises recording fps and scale based on per-frame cost.
+
+    Every captured frame reports how long it took to grab, convert and
+    encode. When too many frames in a sliding window overrun the frame
+    budget, the controller steps down one level. When frames keep fitting
+    comfortably into the budget of the level above (scaled by its pixel
+    count), it steps back up. A cooldown after every change keeps it from
+    oscillating between two levels.
+    """
+
+    def __init__(self, levels=DEFAULT_LEVELS, window=30, overrun_ratio=0.3,
+                 recover_frames=90, headroom=0.6, cooldown=2.0):
+        self.levels = tuple(levels)
+        self.index = 0
+        self.overruns = deque(maxlen=window)
+        self.overrun_ratio = overrun_ratio
+        self.recover_frames = recover_frames
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.good_frames = 0
+        self.last_change = None
+        self.changes = []
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    @property
+    def fps(self):
+        return self.level.fps
+
+    @property
+    def scale(self):
+        return self.level.scale
+
+    def record(self, elapsed, timestamp):
+        """Report the cost of one frame in seconds, returns True if the level changed"""
+        budget = 1.0 / self.fps
+        self.overruns.append(elapsed > budget)
+
+        # Would this frame have fit into the budget of the level above?
+        if self.index > 0:
+            up = self.levels[self.index - 1]
+            estimate = elapsed * (up.scale / self.scale) ** 2
+            if estimate <= self.headroom / up.fps:
+                self.good_frames += 1
+            else:
+                self.good_frames = 0
+
+        if self.last_change is not None and timestamp - self.last_change < self.cooldown:
+            return False
+
+        window_full = len(self.overruns) == self.overruns.maxlen
+        if (window_full and self.index < len(self.levels) - 1
+                and sum(self.overruns) >= self.overrun_ratio * len(self.overruns)):
+            self._change(self.index + 1, timestamp, "overrun", elapsed)
+            return True
+        if self.index > 0 and self.good_frames >= self.recover_frames:
+            self._change(self.index - 1, timestamp, "headroom", elapsed)
+            return True
+        return False
+
+    def _change(self, index, timestamp, reason, elapsed):
+        self.index = index
+        self.overruns.clear()
+        self.good_frames = 0
+        self.last_change = timestamp
+        self.changes.append({
+            "time": round(timestamp, 3),
+            "fps": self.fps,
+            "scale": self.scale,
+            "reason": reason,
+            "frame_ms": round(elapsed * 1000, 2),
+        })
+
+
+def _scale_segment(path, target, fps, size, fourcc):
+    """Re-encode one segment at its own frame rate, scaled down to size"""
+    import cv2
+    capture = cv2.VideoCapture(path)
+    out = cv2.VideoWriter(target, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            out.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+    finally:
+        capture.release()
+        out.release()
+
+
+def join_segments(segments, target, fourcc='mp4v'):
+    """Join (path, fps, size) segments into one video at the smallest segment size.
+
+    Segments already at that size are concatenated without re-encoding and
+    keep their own frame rate, so a recording that had to lower its
+    quality is not scaled back up; the quality changes are in the metadata
+    next to the recording. Only larger segments are scaled down first.
+    Without ffmpeg everything is re-encoded once, at the highest frame rate.
+    """
+    from parallel_encoder import concat_segments
+    size = min((segment_size for _, _, segment_size in segments), key=lambda s: s[0] * s[1])
+    fps = max(segment_fps for _, segment_fps, _ in segments)
+    parts, scaled = [], []
+    try:
+        for path, segment_fps, segment_size in segments:
+            if tuple(segment_size) != tuple(size):
+                scaled_path = os.path.splitext(path)[0] + "_scaled.mp4"
+                _scale_segment(path, scaled_path, segment_fps, size, fourcc)
+                scaled.append(scaled_path)
+                path = scaled_path
+            parts.append((path, segment_fps))
+        if shutil.which("ffmpeg"):
+            concat_segments([path for path, _ in parts], target, fps, size, fourcc)
+        else:
+            _reencode_segments(parts, target, fps, size, fourcc)
+    finally:
+        for path in scaled:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _reencode_segments(segments, target, fps, size, fourcc):
+    # Frames are repeated so every segment keeps its duration at the output rate
+    import cv2
+    print("ffmpeg not found, re-encoding segments to join them")
+    out = cv2.VideoWriter(target, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    offset = 0.0
+    written = 0
+    try:
+        for path, segment_fps in segments:
+            capture = cv2.VideoCapture(path)
+            count = 0
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                count += 1
+                end = int(round((offset + count / segment_fps) * fps))
+                while written < end:
+                    out.write(frame)
+                    written += 1
+            capture.release()
+            offset += count / segment_fps
+    finally:
+        out.release()
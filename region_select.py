@@ -0,0 +1,133 @@
+import numpy as np
+from PyQt5.QtWidgets import QDialog, QApplication
+from PyQt5.QtCore import Qt, QRect, QPoint
+from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QPen
+
+MIN_SELECTION = 4
+DIM_COLOR = QColor(0, 0, 0, 120)
+
+
+def frame_to_pixmap(frame):
+    """Wrap a BGRA frame as a QPixmap without converting it first"""
+    frame = np.ascontiguousarray(frame)
+    height, width = frame.shape[:2]
+    # BGRA in memory is RGB32 on little-endian machines
+    image = QImage(frame.data, width, height, frame.strides[0], QImage.Format_RGB32)
+    return QPixmap.fromImage(image)
+
+
+class RegionSelectDialog(QDialog):
+    """Full-screen overlay on a frozen frame where a rectangle is dragged out.
+
+    The frame is turned into pixmaps once, a dimmed copy for the background
+    and the original for the selection, so painting only blits pixmaps and
+    only the area around the changing selection is repainted. region()
+    returns the selection in frame pixels.
+    """
+
+    def __init__(self, frame, parent=None):
+        super().__init__(parent)
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setCursor(Qt.CrossCursor)
+        self.frame_size = (frame.shape[1], frame.shape[0])
+        self.pixmap = frame_to_pixmap(frame)
+        self.dimmed = QPixmap(self.pixmap)
+        painter = QPainter(self.dimmed)
+        painter.fillRect(self.dimmed.rect(), DIM_COLOR)
+        painter.end()
+        self.origin = None
+        self.selection = QRect()
+
+        screen = QApplication.primaryScreen().geometry()
+        self.setGeometry(screen)
+        # Frame pixels per widget pixel, e.g. on high-dpi screens
+        self.scale_x = self.frame_size[0] / max(1, screen.width())
+        self.scale_y = self.frame_size[1] / max(1, screen.height())
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.activateWindow()
+        self.setFocus()
+
+    def _source_rect(self, rect):
+        return QRect(int(rect.x() * self.scale_x), int(rect.y() * self.scale_y),
+                     int(rect.width() * self.scale_x), int(rect.height() * self.scale_y))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        target = event.rect()
+        painter.drawPixmap(target, self.dimmed, self._source_rect(target))
+        if not self.selection.isEmpty():
+            visible = self.selection.intersected(target)
+            painter.drawPixmap(visible, self.pixmap, self._source_rect(visible))
+            painter.setPen(QPen(QColor('#0078d4'), 1))
+            painter.drawRect(self.selection.adjusted(0, 0, -1, -1))
+            # Selection size in frame pixels
+            x, y, width, height = self.region()
+            label = f"{width} × {height}"
+            anchor = self.selection.topLeft() + QPoint(4, -6)
+            if anchor.y() < 16:
+                anchor = self.selection.topLeft() + QPoint(4, 16)
+            painter.setPen(Qt.white)
+            painter.drawText(anchor, label)
+
+    def _dirty_rect(self, rect):
+        # Room for the size label above the selection
+        return rect.adjusted(-2, -24, 120, 24)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.RightButton:
+            self.reject()
+            return
+        if event.button() == Qt.LeftButton:
+            self.origin = event.pos()
+            self.update(self._dirty_rect(self.selection))
+            self.selection = QRect(self.origin, self.origin)
+
+    def mouseMoveEvent(self, event):
+        if self.origin is None:
+            return
+        previous = self.selection
+        self.selection = QRect(self.origin, event.pos()).normalized()
+        self.update(self._dirty_rect(previous.united(self.selection)))
+
+    def mouseReleaseEvent(self, event):
+        if event.button() != Qt.LeftButton or self.origin is None:
+            return
+        self.origin = None
+        if self.selection.width() >= MIN_SELECTION and self.selection.height() >= MIN_SELECTION:
+            self.accept()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape:
+            self.reject()
+        else:
+            super().keyPressEvent(event)
+
+    def region(self):
+        """(x, y, width, height) of the selection in frame pixels"""
+        rect = self._source_rect(self.selection)
+        x = min(max(0, rect.x()), self.frame_size[0] - 1)
+        y = min(max(0, rect.y()), self.frame_size[1] - 1)
+        width = min(rect.width(), self.frame_size[0] - x)
+        height = min(rect.height(), self.frame_size[1] - y)
+        return x, y, max(1, width), max(1, height)
+
+
+def select_rect(frame, parent=None):
+    """Let the user drag out a region of a BGRA frame, returns (x, y, width, height) or None"""
+    dialog = RegionSelectDialog(frame, parent)
+    dialog.showFullScreen()
+    if dialog.exec_() != QDialog.Accepted:
+        return None
+    return dialog.region()
+
+
+def select_region(frame, parent=None):
+    """Let the user drag out a region of a BGRA frame, returns the cropped frame or None"""
+    rect = select_rect(frame, parent)
+    if rect is None:
+        return None
+    x, y, width, height = rect
+    # Only the selected rows and columns are copied
+    return np.ascontiguousarray(frame[y:y + height, x:x + width])
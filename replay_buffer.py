@@ -0,0 +1,139 @@
+import time
+import threading
+import tempfile
+from collections import deque
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from frame_source import create_frame_source
+
+DEFAULT_REPLAY_SECONDS = 30
+DEFAULT_REPLAY_FPS = 10
+DEFAULT_REPLAY_BUDGET = 256 * 1024 * 1024
+JPEG_QUALITY = 75
+
+
+class ReplayBuffer(QThread):
+    """Keeps the last few seconds of the screen as a ring of JPEG frames.
+
+    Frames are sampled at a low rate and JPEG-compressed as they arrive;
+    frames identical to the previous one reuse its encoded bytes, so an
+    idle screen costs little more than the grab. The ring is bounded both
+    by duration and by a byte budget. save() writes the ring to a video on
+    a background thread and emits saved() with the temporary file.
+    """
+    saved = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, seconds=DEFAULT_REPLAY_SECONDS, fps=DEFAULT_REPLAY_FPS,
+                 max_bytes=DEFAULT_REPLAY_BUDGET, scale=1.0, source_factory=create_frame_source):
+        super().__init__()
+        self.seconds = seconds
+        self.fps = fps
+        self.max_bytes = max_bytes
+        self.scale = scale
+        self.source_factory = source_factory
+        self.running = False
+        self.frames = deque()  # (timestamp, jpeg bytes)
+        self.total_bytes = 0
+        self.frame_size = None
+        self.lock = threading.Lock()
+
+    def run(self):
+        import cv2
+        try:
+            with self.source_factory() as source:
+                self.running = True
+                previous = None
+                encoded = None
+                interval = 1.0 / self.fps
+                next_time = time.perf_counter()
+                while self.running:
+                    frame = source.grab()
+                    if self.scale != 1.0:
+                        frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale,
+                                           interpolation=cv2.INTER_AREA)
+                    # Only encode when the screen changed
+                    if previous is None or not np.array_equal(frame, previous):
+                        ok, buffer = cv2.imencode('.jpg', frame[:, :, :3],
+                                                  [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                        if ok:
+                            encoded = buffer.tobytes()
+                        previous = frame
+                    if encoded is not None:
+                        self.append(time.monotonic(), encoded, (frame.shape[1], frame.shape[0]))
+
+                    # Sleep until the next sample instead of spinning
+                    next_time += interval
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_time = time.perf_counter()
+        except Exception as e:
+            print(f"Error in replay buffer: {e}")
+            self.failed.emit(str(e))
+        finally:
+            self.running = False
+
+    def append(self, timestamp, data, size):
+        with self.lock:
+            self.frame_size = size
+            # Repeated frames share one bytes object and are counted once
+            if not self.frames or self.frames[-1][1] is not data:
+                self.total_bytes += len(data)
+            self.frames.append((timestamp, data))
+            # Drop frames that are too old or over the memory cap
+            while self.frames and (timestamp - self.frames[0][0] > self.seconds
+                                   or self.total_bytes > self.max_bytes):
+                _, old = self.frames.popleft()
+                if not self.frames or self.frames[0][1] is not old:
+                    self.total_bytes -= len(old)
+
+    def stop(self):
+        self.running = False
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.total_bytes = 0
+
+    def memory_usage(self):
+        """Bytes of compressed frames held by the ring"""
+        with self.lock:
+            return self.total_bytes
+
+    def save(self):
+        """Write the buffered frames to a video in the background"""
+        with self.lock:
+            frames = list(self.frames)
+            size = self.frame_size
+        if not frames:
+            self.failed.emit("The replay buffer is empty")
+            return
+        threading.Thread(target=self._write, args=(frames, size), daemon=True).start()
+
+    def _write(self, frames, size):
+        import cv2
+        try:
+            with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as f:
+                temp_file = f.name
+            out = cv2.VideoWriter(temp_file, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, size)
+            start = frames[0][0]
+            written = 0
+            decoded = None
+            last_data = None
+            for index, (timestamp, data) in enumerate(frames):
+                if data is not last_data:
+                    decoded = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                    last_data = data
+                # Place frames by timestamp so late samples keep real time
+                end = frames[index + 1][0] if index + 1 < len(frames) else timestamp + 1.0 / self.fps
+                target = max(written + 1, int(round((end - start) * self.fps)))
+                while written < target:
+                    out.write(decoded)
+                    written += 1
+            out.release()
+            self.saved.emit(temp_file)
+        except Exception as e:
+            print(f"Error saving replay: {e}")
+            self.failed.emit(str(e))
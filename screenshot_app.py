@@ -1,86 +1,319 @@
+import os
 import sys
-import mss
+from single_instance import parse_command, forward_command, CommandServer
+
+# Hand commands to a running instance before the heavy imports below
+if __name__ == '__main__':
+    try:
+        COMMAND = parse_command(sys.argv[1:])
+    except ValueError as e:
+        sys.exit(str(e))
+    if COMMAND and forward_command(*COMMAND):
+        sys.exit(0)
+
+import json
+import multiprocessing
 import numpy as np
 from datetime import datetime
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, 
                            QVBoxLayout, QWidget, QLabel, QHBoxLayout,
-                           QFileDialog, QMessageBox, QDialog, QComboBox)
-from PyQt5.QtCore import Qt, QPoint, QThread, pyqtSignal, QTimer
-from PyQt5.QtGui import QIcon, QFont, QColor, QImage
-from editor import EditorDialog
+                           QFileDialog, QMessageBox, QDialog, QComboBox, QMenu,
+                           QProgressDialog)
+from PyQt5.QtCore import Qt, QPoint, QThread, pyqtSignal, QTimer, QStandardPaths
+from PyQt5.QtGui import QIcon, QFont, QColor, QImage, QPixmap
+from editor import EditorDialog, apply_editor_theme
+from history import CaptureHistory, DEFAULT_HISTORY_BUDGET
+from gallery import GalleryDialog
+from frame_source import create_frame_source
+from capture_backends import select_backend, set_backend_override
+from animated_export import AnimatedExportWorker
+from video_trim import TrimDialog, TrimWorker
+from parallel_encoder import SegmentedEncoder
+from spool import SpoolWriter, transcode_spool
+from replay_buffer import ReplayBuffer
+from region_select import select_region, select_rect
+from watch_mode import ScreenWatcher
+from quality_controller import AdaptiveQualityController, levels_for_fps, join_segments
+from image_utils import DEFAULT_PNG_COMPRESSION
+from settings_dialog import SettingsDialog, load_settings, save_settings
+import tracing
 import time
 from PIL import Image
 
+def bgra_to_qimage(bgra, size):
+    """Convert raw BGRA pixels from mss into an RGB QImage"""
+    img = Image.frombytes('RGBA', size, bgra, 'raw', 'BGRA')
+    # Convert to RGB while maintaining quality
+    img = img.convert('RGB')
+    
+    # Create QImage with native format
+    w, h = img.size
+    return QImage(img.tobytes('raw', 'RGB'), w, h, w * 3, QImage.Format_RGB888)
+
+def bgra_to_bgr(frame):
+    """Convert a BGRA frame to the BGR layout cv2.VideoWriter expects"""
+    import cv2
+    return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+
+# Video encoder backends for VideoRecorder
+ENCODER_OPENCV = "opencv"      # cv2.VideoWriter on the recording thread
+ENCODER_PARALLEL = "parallel"  # Fixed-length segments encoded on all cores
+ENCODER_SPOOL = "spool"        # Lossless spool, transcoded after recording
+ENCODERS = (ENCODER_OPENCV, ENCODER_PARALLEL, ENCODER_SPOOL)
+
+DEFAULT_RECORDING_FPS = 30.0
+# How often a paused recorder checks whether to resume
+PAUSE_POLL_INTERVAL = 0.02
+
+# Values of the settings dialog until the user changes them
+SETTINGS_DEFAULTS = {
+    "fps": DEFAULT_RECORDING_FPS,
+    "encoder": ENCODER_OPENCV,
+    "scale": 1.0,
+    "workers": 0,  # Automatic
+    "history_mb": DEFAULT_HISTORY_BUDGET // (1024 * 1024),
+    "png_compression": DEFAULT_PNG_COMPRESSION,
+}
+
+def recording_metadata_path(video_file):
+    """Sidecar file with the quality changes of a recording"""
+    return video_file + ".json"
+
+def discard_metadata(video_file):
+    path = recording_metadata_path(video_file)
+    if os.path.exists(path):
+        os.remove(path)
+
 class VideoRecorder(QThread):
     finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
     
-    def __init__(self):
+    def __init__(self, source_factory=create_frame_source, encoder=ENCODER_OPENCV,
+                 fps=DEFAULT_RECORDING_FPS, adaptive=True, scale=1.0, workers=None):
         super().__init__()
-        self.running = False
+        # Set by stop(), cleared by start(), so a stop while the source opens is not lost
+        self.stop_requested = False
+        self.paused = False
         self.temp_file = None
+        self.segments = []
+        # Called on the recording thread to open the frame source
+        self.source_factory = source_factory
+        self.encoder = encoder
+        self.fps = fps
+        # Output resolution relative to the screen
+        self.scale = scale
+        # Encoder processes of the parallel encoder, None for automatic
+        self.workers = workers
+        # Lower fps and scale when frames cannot keep up
+        self.adaptive = adaptive
+        self.quality_changes = []
+    
+    def open_writer(self, path, fps, width, height):
+        """Create the video writer for one segment of this recording"""
+        import cv2
+        if self.encoder == ENCODER_SPOOL:
+            return SpoolWriter(os.path.splitext(path)[0] + '.spool', fps, (width, height))
+        if self.encoder == ENCODER_PARALLEL:
+            if SegmentedEncoder.available():
+                return SegmentedEncoder(path, fps, (width, height), workers=self.workers)
+            print("ffmpeg not found, parallel encoding disabled")
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        return cv2.VideoWriter(path, fourcc, fps, (width, height))
+    
+    def open_segment(self, fps, scale, width, height):
+        """Start a new segment at the given fps and scale, returns (writer, size)"""
+        if scale == 1.0:
+            size = (width, height)
+        else:
+            # Encoders want even dimensions
+            size = (max(2, int(width * scale) & ~1), max(2, int(height * scale) & ~1))
+        path = f"{os.path.splitext(self.temp_file)[0]}_{len(self.segments)}.mp4"
+        writer = self.open_writer(path, fps, *size)
+        self.segments.append({"path": path, "fps": fps, "size": size,
+                              "spool": writer.path if isinstance(writer, SpoolWriter) else None})
+        return writer, size
+    
+    def start(self, *args):
+        self.stop_requested = False
+        super().start(*args)
     
     def run(self):
         try:
             import cv2
             import tempfile
-            import os
             
             # Create temporary file
             with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as f:
                 self.temp_file = f.name
+            self.segments = []
+            self.quality_changes = []
             
             # Initialize screen capture
-            with mss.mss() as sct:
-                # Get monitor
-                monitor = sct.monitors[1]  # Primary monitor
+            with self.source_factory() as source:
+                # Get the output size
+                width = source.width
+                height = source.height
+                if self.scale != 1.0:
+                    # Encoders want even dimensions
+                    width = max(2, int(width * self.scale) & ~1)
+                    height = max(2, int(height * self.scale) & ~1)
                 
-                # Get the screen size
-                width = monitor["width"]
-                height = monitor["height"]
+                controller = None
+                fps, scale = self.fps, 1.0
+                if self.adaptive:
+                    controller = AdaptiveQualityController(levels_for_fps(self.fps))
+                    fps, scale = controller.fps, controller.scale
                 
                 # Initialize video writer
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                out = cv2.VideoWriter(self.temp_file, fourcc, 30.0, (width, height))
+                out, size = self.open_segment(fps, scale, width, height)
                 
-                self.running = True
-                while self.running:
-                    # Capture screen
-                    screenshot = sct.grab(monitor)
+                start = next_time = segment_start = time.perf_counter()
+                written = 0
+                # Time spent paused, left out of the timestamps given to the writer
+                paused_total = 0.0
+                timestamped = isinstance(out, SpoolWriter)
+                while not self.stop_requested:
+                    if self.paused:
+                        # Keep the source and writer open but capture nothing
+                        paused_at = time.perf_counter()
+                        while self.paused and not self.stop_requested:
+                            time.sleep(PAUSE_POLL_INTERVAL)
+                        # Shift the timeline so the video continues where it paused
+                        gap = time.perf_counter() - paused_at
+                        paused_total += gap
+                        start += gap
+                        segment_start += gap
+                        next_time += gap
+                        continue
+                    
+                    # Wait for the next frame instead of capturing as fast as possible
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    frame_start = time.perf_counter()
+                    
+                    # Capture screen and convert from BGRA to BGR
+                    frame = bgra_to_bgr(source.grab())
+                    if (frame.shape[1], frame.shape[0]) != size:
+                        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
                     
-                    # Convert to numpy array
-                    frame = np.array(screenshot)
+                    if timestamped:
+                        # transcode_spool places frames by timestamp and fills stalls itself
+                        out.write(frame, frame_start - paused_total)
+                    else:
+                        # Write frame, repeated if capture fell behind so the video keeps real time
+                        due = int((frame_start - segment_start) * fps) + 1
+                        repeats = min(max(1, due - written), int(fps))
+                        for _ in range(repeats):
+                            out.write(frame)
+                        written += repeats
                     
-                    # Convert from BGRA to BGR
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+                    next_time += 1.0 / fps
+                    if next_time < time.perf_counter():
+                        next_time = time.perf_counter()
                     
-                    # Write frame
-                    out.write(frame)
+                    if controller and controller.record(time.perf_counter() - frame_start,
+                                                        frame_start - start):
+                        # A new level needs a writer with a new rate and size
+                        out.release()
+                        fps, scale = controller.fps, controller.scale
+                        out, size = self.open_segment(fps, scale, width, height)
+                        timestamped = isinstance(out, SpoolWriter)
+                        segment_start = next_time = time.perf_counter()
+                        written = 0
                 
                 # Release everything
                 out.release()
-                
-                # Emit the temporary file path
-                self.finished.emit(self.temp_file)
+                if controller:
+                    self.quality_changes = controller.changes
+            
+            self.finish_segments()
+            if self.quality_changes:
+                self.write_metadata(width, height)
+            
+            # Emit the temporary file path
+            self.finished.emit(self.temp_file)
                 
         except Exception as e:
             print(f"Error recording video: {e}")
+            self.remove_segments()
             if self.temp_file and os.path.exists(self.temp_file):
                 os.remove(self.temp_file)
+            self.failed.emit(str(e))
+    
+    def finish_segments(self):
+        """Turn the recorded segments into the final temporary file"""
+        try:
+            # The expensive encode of a spool happens after capture
+            for segment in self.segments:
+                if segment["spool"]:
+                    transcode_spool(segment["spool"], segment["path"])
+                    os.remove(segment["spool"])
+                    segment["spool"] = None
+            if len(self.segments) == 1:
+                os.replace(self.segments[0]["path"], self.temp_file)
+            else:
+                # Segments differ in fps and size; the join keeps the reduced quality
+                join_segments([(segment["path"], segment["fps"], segment["size"]) for segment in self.segments],
+                              self.temp_file)
+        finally:
+            self.remove_segments()
+    
+    def remove_segments(self):
+        for segment in self.segments:
+            for path in (segment["path"], segment["spool"]):
+                if path and os.path.exists(path):
+                    os.remove(path)
+        self.segments = []
+    
+    def write_metadata(self, width, height):
+        """Record the quality changes next to the recording"""
+        metadata = {
+            "fps": self.fps,
+            "size": [width, height],
+            "encoder": self.encoder,
+            "quality_changes": self.quality_changes,
+        }
+        with open(recording_metadata_path(self.temp_file), "w") as f:
+            json.dump(metadata, f, indent=2)
+    
+    def pause(self):
+        self.paused = True
+    
+    def resume(self):
+        self.paused = False
     
     def stop(self):
-        self.running = False
+        self.stop_requested = True
+        self.paused = False
 
 class ScreenshotApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.screenshot_delay = 0  # Default delay in seconds
+        self.capture_region = False  # Select a region before opening the editor
         self.countdown_timer = None
         self.countdown_remaining = 0
-        self.video_recorder = VideoRecorder()
+        # Fastest capture backend for this display, benchmarked once and cached
+        self.capture_backend = select_backend()
+        self.recording_backend = select_backend(gui_thread=False)
+        self.video_recorder = VideoRecorder(source_factory=self.open_recording_source)
         self.video_recorder.finished.connect(self.recording_finished)
+        self.video_recorder.failed.connect(self.recording_failed)
         self.is_recording = False
+        self.replay_buffer = None
+        self.screen_watcher = None
+        self.watch_captures = 0
+        self.settings = load_settings(SETTINGS_DEFAULTS)
+        self.capture_history = CaptureHistory(self.settings["history_mb"] * 1024 * 1024)
+        self.gallery_directory = QStandardPaths.writableLocation(QStandardPaths.PicturesLocation)
         self.last_position = None  # Store the last position
+        self.editor_dialog = None  # Built once while idle, reused for every capture
         self.initUI()
+        QTimer.singleShot(0, self.prewarm_editor)
+        # Later launches forward their commands to this instance
+        self.command_server = CommandServer(self.handle_command, self)
+        self.command_server.listen()
 
     def initUI(self):
         """Initialize the UI"""
@@ -131,6 +364,13 @@ class ScreenshotApp(QMainWindow):
         self.screenshot_btn.clicked.connect(self.take_screenshot)
         toolbar_layout.addWidget(self.screenshot_btn)
 
+        # Region screenshot button
+        self.region_btn = QPushButton("⬚")
+        self.region_btn.setObjectName("actionButton")
+        self.region_btn.setToolTip("Capture Region")
+        self.region_btn.clicked.connect(self.take_region_screenshot)
+        toolbar_layout.addWidget(self.region_btn)
+
         # Video button
         self.video_btn = QPushButton("🎥")
         self.video_btn.setObjectName("actionButton")
@@ -138,6 +378,54 @@ class ScreenshotApp(QMainWindow):
         self.video_btn.clicked.connect(self.toggle_recording)
         toolbar_layout.addWidget(self.video_btn)
 
+        # Pause button, only enabled while recording
+        self.pause_btn = QPushButton("⏸")
+        self.pause_btn.setObjectName("actionButton")
+        self.pause_btn.setToolTip("Pause Recording")
+        self.pause_btn.setCheckable(True)
+        self.pause_btn.setEnabled(False)
+        self.pause_btn.toggled.connect(self.toggle_pause)
+        toolbar_layout.addWidget(self.pause_btn)
+
+        # Instant replay toggle and save buttons
+        self.replay_btn = QPushButton("⏪")
+        self.replay_btn.setObjectName("actionButton")
+        self.replay_btn.setToolTip("Instant Replay: keep the last seconds of screen")
+        self.replay_btn.setCheckable(True)
+        self.replay_btn.toggled.connect(self.toggle_replay)
+        toolbar_layout.addWidget(self.replay_btn)
+
+        self.save_replay_btn = QPushButton("💾")
+        self.save_replay_btn.setObjectName("actionButton")
+        self.save_replay_btn.setToolTip("Save Replay")
+        self.save_replay_btn.setEnabled(False)
+        self.save_replay_btn.clicked.connect(self.save_replay)
+        toolbar_layout.addWidget(self.save_replay_btn)
+
+        # Watch mode toggle
+        self.watch_btn = QPushButton("👁")
+        self.watch_btn.setObjectName("actionButton")
+        self.watch_btn.setToolTip("Watch Mode: capture a region whenever it changes")
+        self.watch_btn.setCheckable(True)
+        self.watch_btn.toggled.connect(self.toggle_watch)
+        toolbar_layout.addWidget(self.watch_btn)
+
+        # Recent captures button
+        self.history_btn = QPushButton("🕘")
+        self.history_btn.setObjectName("actionButton")
+        self.history_btn.setToolTip("Recent Captures")
+        self.history_menu = QMenu(self)
+        self.history_menu.aboutToShow.connect(self.populate_history_menu)
+        self.history_btn.setMenu(self.history_menu)
+        toolbar_layout.addWidget(self.history_btn)
+
+        # Gallery button
+        gallery_btn = QPushButton("🖼")
+        gallery_btn.setObjectName("actionButton")
+        gallery_btn.setToolTip("Browse Screenshots")
+        gallery_btn.clicked.connect(self.show_gallery)
+        toolbar_layout.addWidget(gallery_btn)
+
         # Delay label and combo box
         delay_label = QLabel("Delay:")
         delay_label.setObjectName("toolbarLabel")
@@ -153,6 +441,7 @@ class ScreenshotApp(QMainWindow):
         settings_btn = QPushButton("⚙️")
         settings_btn.setObjectName("actionButton")
         settings_btn.setToolTip("Settings")
+        settings_btn.clicked.connect(self.show_settings)
         toolbar_layout.addWidget(settings_btn)
 
         self.main_layout.addWidget(self.toolbar)
@@ -204,6 +493,25 @@ class ScreenshotApp(QMainWindow):
             #actionButton:hover {
                 background: #555555;
             }
+            #actionButton:checked {
+                background: #0078d4;
+            }
+            #actionButton:disabled {
+                color: #777777;
+            }
+            #actionButton::menu-indicator {
+                image: none;
+            }
+            QMenu {
+                background: #333333;
+                border: 1px solid #444444;
+            }
+            QMenu::item {
+                padding: 6px 12px;
+            }
+            QMenu::item:selected {
+                background: #555555;
+            }
             #toolbarLabel {
                 color: #aaa;
                 font-size: 13px;
@@ -228,27 +536,70 @@ class ScreenshotApp(QMainWindow):
             }
         """)
 
-        self.resize(400, 80)
+        self.resize(750, 80)
         self.center_on_screen()
 
+    def open_recording_source(self):
+        """Open the capture backend for recording threads"""
+        return create_frame_source(self.recording_backend)
+
     def update_delay(self, delay_text):
         if delay_text == "0s":
             self.screenshot_delay = 0
         else:
             self.screenshot_delay = int(delay_text.replace("s", ""))
 
+    def handle_command(self, command, args):
+        """Run a command from the command line, returns an error message or None"""
+        if command == "show":
+            self.show()
+            self.raise_()
+            self.activateWindow()
+        elif command in ("capture", "region"):
+            if not (self.screenshot_btn.isEnabled() and self.region_btn.isEnabled()):
+                return "A capture is already in progress"
+            if self.editor_in_use():
+                return "Editor is open"
+            if command == "region":
+                self.take_region_screenshot()
+            else:
+                self.take_screenshot()
+        elif command == "record":
+            action = args[0] if args else "toggle"
+            if not self.video_btn.isEnabled():
+                return "The previous recording is still being saved"
+            if action in ("pause", "resume"):
+                if not self.is_recording:
+                    return "Not recording"
+                self.pause_btn.setChecked(action == "pause")
+            elif action == "toggle" or (action == "start") != self.is_recording:
+                self.toggle_recording()
+        else:
+            return f"Unknown command: {command}"
+        return None
+
+    def take_region_screenshot(self):
+        self.capture_region = True
+        self.take_screenshot()
+
     def take_screenshot(self):
+        with tracing.span("take_screenshot", delay=self.screenshot_delay, region=self.capture_region):
+            self._take_screenshot()
+
+    def _take_screenshot(self):
         if self.screenshot_delay > 0:
             # Start countdown
             self.countdown_remaining = self.screenshot_delay
             self.screenshot_btn.setText(str(self.countdown_remaining))
             self.screenshot_btn.setEnabled(False)
+            self.region_btn.setEnabled(False)
             self.countdown_timer = QTimer()
             self.countdown_timer.timeout.connect(self.update_countdown)
             self.countdown_timer.start(1000)
         else:
             # Take screenshot immediately with a small delay
             self.screenshot_btn.setEnabled(False)
+            self.region_btn.setEnabled(False)
             QTimer.singleShot(500, self.capture_screen)
 
     def update_countdown(self):
@@ -260,11 +611,16 @@ class ScreenshotApp(QMainWindow):
             self.countdown_timer = None
             self.screenshot_btn.setText("📸")
             self.screenshot_btn.setEnabled(False)
+            self.region_btn.setEnabled(False)
             # Take screenshot after countdown
             QTimer.singleShot(500, self.capture_screen)
 
     def capture_screen(self):
         """Capture the screen content"""
+        with tracing.span("capture_screen", backend=self.capture_backend, region=self.capture_region):
+            self._capture_screen()
+
+    def _capture_screen(self):
         try:
             # Store the current position
             current_pos = self.pos()
@@ -274,78 +630,364 @@ class ScreenshotApp(QMainWindow):
             QApplication.processEvents()
             time.sleep(0.1)  # Small delay to ensure window is hidden
             
-            with mss.mss() as sct:
-                # Get the primary monitor
-                monitor = sct.monitors[1]  # Primary monitor
-                
+            with create_frame_source(self.capture_backend) as source:
                 # Capture the screen
-                screenshot = sct.grab(monitor)
+                started = time.perf_counter()
+                with tracing.span("grab"):
+                    frame = source.grab()
+                size = source.size
+                
+                if self.capture_region:
+                    # Only the dragged out part of the frozen frame goes to the editor
+                    self.capture_region = False
+                    frame = select_region(frame)
+                    if frame is None:
+                        self.move(current_pos)
+                        self.show()
+                        self.screenshot_btn.setEnabled(True)
+                        self.region_btn.setEnabled(True)
+                        self.screenshot_btn.setText("📸")
+                        return
+                    size = (frame.shape[1], frame.shape[0])
                 
                 # Convert to QImage with high quality
-                img = Image.frombytes('RGBA', screenshot.size, screenshot.bgra, 'raw', 'BGRA')
-                # Convert to RGB while maintaining quality
-                img = img.convert('RGB')
+                image = bgra_to_qimage(frame, size)
                 
-                # Create QImage with native format
-                w, h = img.size
-                image = QImage(img.tobytes('raw', 'RGB'), w, h, w * 3, QImage.Format_RGB888)
+                # Keep the capture so it can be reopened later
+                self.capture_history.add(image)
                 
                 # Show the window again at its original position
                 self.move(current_pos)
                 self.show()
                 
                 # Show editor dialog
-                editor_dialog = EditorDialog(image, self)
-                editor_dialog.exec_()
+                self.open_editor(image, started)
                 
                 # Re-enable the screenshot button
                 self.screenshot_btn.setEnabled(True)
+                self.region_btn.setEnabled(True)
                 self.screenshot_btn.setText("📸")
                 
         except Exception as e:
             print(f"Error capturing screenshot: {e}")  # Debug print
+            tracing.instant("capture_error", error=str(e))
+            self.capture_region = False
             self.show()
             self.screenshot_btn.setEnabled(True)
+            self.region_btn.setEnabled(True)
             self.screenshot_btn.setText("📸")
             QMessageBox.critical(self, "Error", f"Failed to capture screenshot: {str(e)}")
 
+    def show_settings(self):
+        dialog = SettingsDialog(self.settings, ENCODERS, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        self.settings = dialog.values()
+        save_settings(self.settings)
+        try:
+            set_backend_override(dialog.backend())
+        except ValueError as e:
+            print(f"Error setting capture backend: {e}")
+        self.apply_settings()
+
+    def apply_settings(self):
+        """Use the current settings from the next capture on"""
+        self.capture_backend = select_backend()
+        self.recording_backend = select_backend(gui_thread=False)
+        self.capture_history.set_budget(self.settings["history_mb"] * 1024 * 1024)
+
+    def configure_recorder(self):
+        """Hand the recording settings to the recorder before it starts"""
+        recorder = self.video_recorder
+        recorder.fps = self.settings["fps"]
+        recorder.encoder = self.settings["encoder"] if self.settings["encoder"] in ENCODERS else ENCODER_OPENCV
+        recorder.scale = self.settings["scale"]
+        recorder.workers = self.settings["workers"] or None
+
+    def populate_history_menu(self):
+        """Fill the recent captures menu from the history"""
+        self.history_menu.clear()
+        entries = self.capture_history.entries()
+        if not entries:
+            action = self.history_menu.addAction("No recent captures")
+            action.setEnabled(False)
+            return
+        for entry in entries:
+            action = self.history_menu.addAction(QIcon(QPixmap.fromImage(entry.thumbnail)), entry.label())
+            action.triggered.connect(lambda checked=False, entry_id=entry.entry_id: self.open_from_history(entry_id))
+
+    def open_from_history(self, entry_id):
+        """Reopen a previous capture in the editor"""
+        image = self.capture_history.image(entry_id)
+        if image is None:
+            QMessageBox.information(self, "Recent Captures", "This capture is no longer in the history.")
+            return
+        self.open_editor(image)
+
+    def prewarm_editor(self):
+        """Build the editor ahead of time so a capture only has to reset it"""
+        if self.editor_dialog is None:
+            self.editor_dialog = EditorDialog(parent=self)
+            self.editor_dialog.prewarm()
+
+    def editor_in_use(self):
+        return self.editor_dialog is not None and self.editor_dialog.isVisible()
+
+    def open_editor(self, image, started=None):
+        """Show an image in the shared editor dialog"""
+        if self.editor_in_use():
+            # A capture that lands while the editor is open, e.g. after a countdown, gets its own
+            editor_dialog = EditorDialog(parent=self)
+        else:
+            self.prewarm_editor()
+            editor_dialog = self.editor_dialog
+        with tracing.span("editor_reset"):
+            editor = editor_dialog.editor
+            editor.png_compression = self.settings["png_compression"]
+            editor.export_workers = self.settings["workers"] or None
+            editor_dialog.reset(image, started)
+        with tracing.span("editor_session"):
+            editor_dialog.exec_()
+        if editor_dialog.open_latency_ms is not None:
+            print(f"Editor visible {editor_dialog.open_latency_ms:.1f} ms after capture")
+        # Do not keep the last screenshot alive until the next capture
+        editor_dialog.editor.clear_image()
+
+    def show_gallery(self):
+        """Browse the screenshots in the gallery directory"""
+        gallery = GalleryDialog(self.gallery_directory, self)
+        # Through the shared editor, so it gets the export settings
+        gallery.open_requested.connect(self.open_editor)
+        gallery.exec_()
+        self.gallery_directory = gallery.directory
+
     def handle_capture_error(self, error_msg):
         """Handle errors during capture"""
         self.show()  # Ensure window is visible
         self.screenshot_btn.setEnabled(True)
+        self.region_btn.setEnabled(True)
         self.screenshot_btn.setText("📸")
         QMessageBox.critical(self, "Error", f"Failed to capture screenshot: {error_msg}")
 
     def toggle_recording(self):
+        with tracing.span("toggle_recording", start=not self.is_recording):
+            self._toggle_recording()
+
+    def _toggle_recording(self):
         if not self.is_recording:
             self.is_recording = True
             self.video_btn.setText("⏹")
             self.video_btn.setProperty('recording', True)
             self.video_btn.style().unpolish(self.video_btn)
             self.video_btn.style().polish(self.video_btn)
+            self.configure_recorder()
             self.video_recorder.start()
+            self.pause_btn.setEnabled(True)
+            tracing.begin("recording", id(self.video_recorder))
         else:
             self.video_recorder.stop()
+            self.pause_btn.setChecked(False)
+            self.pause_btn.setEnabled(False)
+            # Finishing the file can take a while, e.g. transcoding a spool
+            self.video_btn.setText("⏳")
+            self.video_btn.setEnabled(False)
 
-    def recording_finished(self, temp_file):
+    def toggle_pause(self, paused):
+        """Pause or resume the recording without finishing the file"""
+        if paused:
+            self.video_recorder.pause()
+            tracing.instant("recording_paused")
+        else:
+            self.video_recorder.resume()
+            tracing.instant("recording_resumed")
+        self.pause_btn.setText("▶" if paused else "⏸")
+        self.pause_btn.setToolTip("Resume Recording" if paused else "Pause Recording")
+
+    def reset_recording_button(self):
+        self.pause_btn.setChecked(False)
+        self.pause_btn.setEnabled(False)
         self.is_recording = False
         self.video_btn.setText("🎥")
+        self.video_btn.setEnabled(True)
         self.video_btn.setProperty('recording', False)
         self.video_btn.style().unpolish(self.video_btn)
         self.video_btn.style().polish(self.video_btn)
+
+    def recording_finished(self, temp_file):
+        tracing.end("recording", id(self.video_recorder))
+        with tracing.span("recording_finished", file=temp_file):
+            self.reset_recording_button()
+            self.review_recording(temp_file)
+
+    def recording_failed(self, error_msg):
+        tracing.end("recording", id(self.video_recorder), error=error_msg)
+        self.reset_recording_button()
+        QMessageBox.critical(self, "Error", f"Failed to record video: {error_msg}")
+
+    def toggle_replay(self, enabled):
+        """Start or stop the instant replay buffer"""
+        if enabled:
+            self.replay_buffer = ReplayBuffer(scale=self.settings["scale"], source_factory=self.open_recording_source)
+            self.replay_buffer.saved.connect(self.replay_saved)
+            self.replay_buffer.failed.connect(self.replay_failed)
+            self.replay_buffer.start()
+        elif self.replay_buffer:
+            self.replay_buffer.stop()
+            self.replay_buffer.wait()
+            self.replay_buffer = None
+        self.save_replay_btn.setEnabled(enabled)
+
+    def toggle_watch(self, enabled):
+        """Start watching a region for changes, or stop watching"""
+        if not enabled:
+            if self.screen_watcher:
+                self.screen_watcher.stop()
+                self.screen_watcher.wait()
+                self.screen_watcher = None
+            self.watch_btn.setToolTip("Watch Mode: capture a region whenever it changes")
+            return
+        
+        # Pick the region on a frozen frame, with this window out of the way
+        current_pos = self.pos()
+        self.hide()
+        QApplication.processEvents()
+        time.sleep(0.1)
+        try:
+            with create_frame_source(self.capture_backend) as source:
+                region = select_rect(source.grab())
+        except Exception as e:
+            print(f"Error selecting watch region: {e}")
+            region = None
+        self.move(current_pos)
+        self.show()
+        directory = None
+        if region:
+            directory = QFileDialog.getExistingDirectory(self, "Save Watch Captures To", self.gallery_directory)
+        if not directory:
+            self.watch_btn.setChecked(False)
+            return
         
+        self.watch_captures = 0
+        self.screen_watcher = ScreenWatcher(directory, region, source_factory=self.open_recording_source)
+        self.screen_watcher.captured.connect(self.watch_captured)
+        self.screen_watcher.failed.connect(
+            lambda error: QMessageBox.warning(self, "Watch Mode", f"Watch mode failed: {error}"))
+        self.screen_watcher.start()
+        self.watch_btn.setToolTip(f"Watching {region[2]}×{region[3]} region, saving to {directory}")
+
+    def watch_captured(self, path):
+        self.watch_captures += 1
+        self.watch_btn.setToolTip(f"Watch Mode: {self.watch_captures} captures, last {os.path.basename(path)}")
+
+    def save_replay(self):
+        """Dump the replay buffer to a video in the background"""
+        if self.replay_buffer:
+            self.save_replay_btn.setEnabled(False)
+            self.replay_buffer.save()
+
+    def replay_saved(self, temp_file):
+        self.save_replay_btn.setEnabled(self.replay_buffer is not None)
+        self.review_recording(temp_file)
+
+    def replay_failed(self, error_msg):
+        # A failed save must not leave the button disabled
+        self.save_replay_btn.setEnabled(self.replay_buffer is not None)
+        QMessageBox.warning(self, "Instant Replay", f"Instant replay failed: {error_msg}")
+
+    def review_recording(self, temp_file):
+        # Let the user cut the recording down before saving
+        try:
+            trim_dialog = TrimDialog(temp_file, self)
+        except Exception as e:
+            print(f"Error opening recording for trimming: {e}")
+            self.save_recording(temp_file)
+            return
+        result = trim_dialog.exec_()
+        if result == TrimDialog.Discarded:
+            os.remove(temp_file)
+            discard_metadata(temp_file)
+            return
+        # Esc or closing the dialog saves the recording untrimmed
+        if result == QDialog.Accepted and trim_dialog.is_trimmed():
+            start, end = trim_dialog.frame_range()
+            self.trim_recording(temp_file, start, end, trim_dialog.use_remux())
+        else:
+            self.save_recording(temp_file)
+
+    def trim_recording(self, temp_file, start, end, remux):
+        """Trim the recording in the background, then ask where to save it"""
+        progress = QProgressDialog("Trimming recording...", None, 0, 100 if not remux else 0, self)
+        progress.setWindowTitle("Trim")
+        progress.setMinimumDuration(0)
+        worker = TrimWorker(temp_file, start, end, remux, parent=self)
+        worker.progress.connect(progress.setValue)
+        worker.failed.connect(lambda error: QMessageBox.critical(self, "Error", f"Failed to trim recording: {error}"))
+        
+        def trimmed(trimmed_file):
+            os.remove(temp_file)
+            # Quality change times no longer match the trimmed file
+            discard_metadata(temp_file)
+            self.save_recording(trimmed_file)
+        worker.trimmed.connect(trimmed)
+        
+        def cleanup():
+            progress.close()
+            worker.deleteLater()
+        worker.finished.connect(cleanup)
+        worker.start()
+
+    def save_recording(self, temp_file, animations=True):
         # Ask user where to save the video
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        file_filter = "Video Files (*.mp4)"
+        if animations:
+            file_filter += ";;Animated GIF (*.gif);;Animated WebP (*.webp)"
         filename, _ = QFileDialog.getSaveFileName(
             self,
             "Save Video",
             f"screen_recording_{timestamp}.mp4",
-            "Video Files (*.mp4)"
+            file_filter
         )
         
-        if filename:
+        if not filename:
+            return
+        if animations and filename.lower().endswith(('.gif', '.webp')):
+            self.export_animation(temp_file, filename)
+        else:
             import shutil
             shutil.move(temp_file, filename)
+            # Keep the quality changes next to the saved video
+            if os.path.exists(recording_metadata_path(temp_file)):
+                shutil.move(recording_metadata_path(temp_file), recording_metadata_path(filename))
+
+    def export_animation(self, temp_file, filename):
+        """Convert the recording to an animation in the background"""
+        progress = QProgressDialog("Exporting animation...", None, 0, 100, self)
+        progress.setWindowTitle("Export")
+        progress.setMinimumDuration(0)
+        worker = AnimatedExportWorker(temp_file, filename, parent=self)
+        worker.progress.connect(progress.setValue)
+        
+        def exported(_):
+            os.remove(temp_file)
+            discard_metadata(temp_file)
+        worker.finished_export.connect(exported)
+        
+        def failed(error):
+            # Keep the recording so the export failure does not lose it
+            progress.close()
+            reply = QMessageBox.question(
+                self, "Error", f"Failed to export animation: {error}\n\nSave the recording as MP4 instead?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if reply == QMessageBox.Yes:
+                self.save_recording(temp_file, animations=False)
+        worker.failed.connect(failed)
+        
+        def cleanup():
+            progress.close()
+            worker.deleteLater()
+        worker.finished.connect(cleanup)
+        worker.start()
 
     def mousePressEvent(self, event):
         """Handle mouse press events"""
@@ -382,6 +1024,19 @@ class ScreenshotApp(QMainWindow):
         if self.last_position:
             self.move(self.last_position)
 
+    def closeEvent(self, event):
+        if self.video_recorder.isRunning():
+            self.video_recorder.stop()
+            self.video_recorder.wait()
+        if self.replay_buffer:
+            self.replay_buffer.stop()
+            self.replay_buffer.wait()
+        if self.screen_watcher:
+            self.screen_watcher.stop()
+            self.screen_watcher.wait()
+        self.capture_history.shutdown()
+        super().closeEvent(event)
+
     def center_on_screen(self):
         screen = QApplication.primaryScreen().size()
         self.move(
@@ -390,7 +1045,14 @@ class ScreenshotApp(QMainWindow):
         )
 
 if __name__ == '__main__':
+    # Needed for the encoder worker processes in the packaged app
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    # Parse the editor theme once, before any widget is polished
+    apply_editor_theme(app)
     window = ScreenshotApp()
     window.show()
+    # A command given to the first instance runs once the event loop is up
+    if COMMAND and COMMAND[0] != "show":
+        QTimer.singleShot(0, lambda: window.handle_command(*COMMAND))
     sys.exit(app.exec_())
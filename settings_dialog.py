@@ -0,0 +1,120 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QPushButton, QComboBox,
+                             QDoubleSpinBox, QSpinBox, QLabel)
+from PyQt5.QtCore import QSettings
+from capture_backends import BACKEND_AUTO, BACKEND_SETTING, BACKENDS
+
+# QSettings keys and value types of the performance settings
+SETTINGS = {
+    "fps": ("recording/fps", float),
+    "encoder": ("recording/encoder", str),
+    "scale": ("recording/scale", float),
+    "workers": ("performance/workers", int),
+    "history_mb": ("history/budget_mb", int),
+    "png_compression": ("export/png_compression", int),
+}
+
+SCALES = (1.0, 0.75, 0.5)
+
+
+def app_settings():
+    return QSettings("screenshot-tool", "Screenshot Tool")
+
+
+def load_settings(defaults):
+    """Stored settings, with defaults for everything that was never saved or is unreadable"""
+    settings = app_settings()
+    values = {}
+    for name, (key, kind) in SETTINGS.items():
+        try:
+            values[name] = kind(settings.value(key, defaults[name]))
+        except (TypeError, ValueError):
+            values[name] = defaults[name]
+    return values
+
+
+def save_settings(values):
+    settings = app_settings()
+    for name, (key, _) in SETTINGS.items():
+        settings.setValue(key, values[name])
+    settings.sync()
+
+
+class SettingsDialog(QDialog):
+    """Performance settings; they apply from the next capture or recording on"""
+
+    def __init__(self, values, encoders, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("⚙️ Settings")
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        layout.addLayout(form)
+
+        self.fps_spin = QDoubleSpinBox()
+        self.fps_spin.setRange(1.0, 120.0)
+        self.fps_spin.setDecimals(1)
+        self.fps_spin.setValue(values["fps"])
+        form.addRow("Recording fps", self.fps_spin)
+
+        self.encoder_combo = QComboBox()
+        self.encoder_combo.addItems(encoders)
+        self.encoder_combo.setCurrentText(values["encoder"])
+        form.addRow("Video encoder", self.encoder_combo)
+
+        self.scale_combo = QComboBox()
+        for scale in SCALES:
+            self.scale_combo.addItem(f"{scale:.0%}", scale)
+        index = self.scale_combo.findData(values["scale"])
+        self.scale_combo.setCurrentIndex(max(0, index))
+        self.scale_combo.setToolTip("Resolution of recordings and instant replays")
+        form.addRow("Recording scale", self.scale_combo)
+
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(0, 64)
+        self.workers_spin.setSpecialValueText("Automatic")
+        self.workers_spin.setValue(values["workers"])
+        self.workers_spin.setToolTip("Threads and processes for encoding videos and large PNGs")
+        form.addRow("Worker threads", self.workers_spin)
+
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItems((BACKEND_AUTO,) + tuple(BACKENDS))
+        self.backend_combo.setCurrentText(app_settings().value(BACKEND_SETTING, BACKEND_AUTO))
+        form.addRow("Capture backend", self.backend_combo)
+
+        self.history_spin = QSpinBox()
+        self.history_spin.setRange(0, 16384)
+        self.history_spin.setSuffix(" MiB")
+        self.history_spin.setValue(values["history_mb"])
+        self.history_spin.setToolTip("Memory for recent captures, 0 keeps no history")
+        form.addRow("History budget", self.history_spin)
+
+        self.png_spin = QSpinBox()
+        self.png_spin.setRange(0, 9)
+        self.png_spin.setValue(values["png_compression"])
+        self.png_spin.setToolTip("0 saves fastest with the largest files, 9 saves the smallest files")
+        form.addRow("PNG compression", self.png_spin)
+
+        layout.addWidget(QLabel("Changes apply from the next capture or recording on."))
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        cancel_btn = QPushButton("Cancel")
+        cancel_btn.clicked.connect(self.reject)
+        buttons.addWidget(cancel_btn)
+        save_btn = QPushButton("💾 Save")
+        save_btn.setDefault(True)
+        save_btn.clicked.connect(self.accept)
+        buttons.addWidget(save_btn)
+        layout.addLayout(buttons)
+
+    def values(self):
+        return {
+            "fps": self.fps_spin.value(),
+            "encoder": self.encoder_combo.currentText(),
+            "scale": self.scale_combo.currentData(),
+            "workers": self.workers_spin.value(),
+            "history_mb": self.history_spin.value(),
+            "png_compression": self.png_spin.value(),
+        }
+
+    def backend(self):
+        return self.backend_combo.currentText()
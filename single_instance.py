@@ -0,0 +1,117 @@
+"""Single-instance mode: forward commands to an already running app.
+
+The first instance listens on a QLocalServer. Later launches connect, send
+their command and exit before Qt widgets, numpy or OpenCV are loaded, so a
+hotkey bound to e.g. ``screenshot_app capture`` triggers the warm instance
+almost instantly:
+
+    screenshot_app                 start, or bring the running app to front
+    screenshot_app capture         full screen capture
+    screenshot_app region          region capture
+    screenshot_app record start    start, stop or toggle a recording
+    screenshot_app record stop
+    screenshot_app record toggle
+    screenshot_app record pause    pause or resume without finishing the file
+    screenshot_app record resume
+
+This module only imports QtCore and QtNetwork to keep forwarding cheap.
+"""
+import sys
+import json
+import getpass
+from PyQt5.QtCore import QObject
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+SERVER_NAME = f"screenshot-tool-{getpass.getuser()}"
+COMMANDS = ("show", "capture", "region", "record")
+RECORD_ACTIONS = ("start", "stop", "toggle", "pause", "resume")
+CONNECT_TIMEOUT_MS = 200
+REPLY_TIMEOUT_MS = 2000
+
+
+def parse_command(argv):
+    """Return (command, args) for a command line, or None if it is not a command"""
+    if not argv:
+        return "show", []
+    command, args = argv[0], list(argv[1:])
+    if command not in COMMANDS:
+        return None
+    if command == "record":
+        if len(args) != 1 or args[0] not in RECORD_ACTIONS:
+            raise ValueError(f"Usage: record {'|'.join(RECORD_ACTIONS)}")
+    elif args:
+        raise ValueError(f"{command} takes no arguments")
+    return command, args
+
+
+def forward_command(command, args):
+    """Send a command to the running instance, returns False if there is none"""
+    socket = QLocalSocket()
+    socket.connectToServer(SERVER_NAME)
+    if not socket.waitForConnected(CONNECT_TIMEOUT_MS):
+        return False
+    socket.write((json.dumps({"command": command, "args": args}) + "\n").encode())
+    socket.waitForBytesWritten(REPLY_TIMEOUT_MS)
+    reply = b""
+    while not reply.endswith(b"\n") and socket.waitForReadyRead(REPLY_TIMEOUT_MS):
+        reply += bytes(socket.readAll())
+    socket.disconnectFromServer()
+    reply = reply.decode(errors="replace").strip()
+    if reply and reply != "ok":
+        print(reply, file=sys.stderr)
+    return True
+
+
+def server_running():
+    """True if a live instance accepts connections, False for no or a stale socket"""
+    socket = QLocalSocket()
+    socket.connectToServer(SERVER_NAME)
+    if not socket.waitForConnected(CONNECT_TIMEOUT_MS):
+        return False
+    socket.disconnectFromServer()
+    return True
+
+
+class CommandServer(QObject):
+    """Accepts commands from later launches and passes them to handler(command, args).
+
+    The handler returns None on success or an error message for the client.
+    """
+
+    def __init__(self, handler, parent=None):
+        super().__init__(parent)
+        self.handler = handler
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self.accept_connections)
+
+    def listen(self):
+        """Start listening, replacing the socket a crashed instance left behind"""
+        if self.server.listen(SERVER_NAME):
+            return True
+        if server_running():
+            print("Error starting command server: another instance is already listening")
+            return False
+        QLocalServer.removeServer(SERVER_NAME)
+        if self.server.listen(SERVER_NAME):
+            return True
+        print(f"Error starting command server: {self.server.errorString()}")
+        return False
+
+    def accept_connections(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self.read_command(socket))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def read_command(self, socket):
+        if not socket.canReadLine():
+            return
+        try:
+            request = json.loads(bytes(socket.readLine()).decode())
+            error = self.handler(request["command"], request.get("args", []))
+        except Exception as e:
+            print(f"Error handling command: {e}")
+            error = str(e)
+        socket.write(((error or "ok") + "\n").encode())
+        socket.flush()
+        socket.disconnectFromServer()
@@ -0,0 +1,194 @@
+"""Fast lossless spool format for recordings, transcoded after capture.
+
+While recording, SpoolWriter stores every frame as the XOR delta from the
+previous frame, compressed with lz4 when it is installed and zlib level 1
+otherwise, into a memory-mapped file. Unchanged regions of the screen turn
+into runs of zeros, which cost almost nothing to compress. The expensive
+encode happens afterwards in transcode_spool(), possibly on another machine:
+
+    python spool.py recording.spool recording.mp4
+"""
+import os
+import sys
+import mmap
+import time
+import zlib
+import struct
+import argparse
+import numpy as np
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+MAGIC = b"SSPOOL1\0"
+# magic, width, height, channels, fps, codec
+HEADER = struct.Struct("<8sIIIdB")
+# payload length, flags, timestamp
+RECORD = struct.Struct("<IBd")
+
+CODEC_ZLIB = 0
+CODEC_LZ4 = 1
+FLAG_KEYFRAME = 1
+
+# A full frame now and then bounds the damage of a corrupt record
+KEYFRAME_INTERVAL = 300
+# The spool file grows in steps of this size
+GROW_BYTES = 256 * 1024 * 1024
+
+
+def _compress(data, codec):
+    if codec == CODEC_LZ4:
+        return lz4.frame.compress(data, compression_level=0)
+    return zlib.compress(data, 1)
+
+
+def _decompress(data, codec):
+    if codec == CODEC_LZ4:
+        return lz4.frame.decompress(data)
+    return zlib.decompress(data)
+
+
+class SpoolWriter:
+    """Writes BGR frames to a spool file, with the cv2.VideoWriter interface"""
+
+    def __init__(self, path, fps, size, channels=3):
+        self.path = path
+        self.fps = fps
+        self.size = size
+        self.codec = CODEC_LZ4 if lz4 is not None else CODEC_ZLIB
+        self.previous = None
+        self.frame_count = 0
+        self.file = open(path, "w+b")
+        self.capacity = 0
+        self.map = None
+        self._grow(HEADER.size)
+        self.map[:HEADER.size] = HEADER.pack(MAGIC, size[0], size[1], channels, fps, self.codec)
+        self.offset = HEADER.size
+
+    def isOpened(self):
+        return self.map is not None
+
+    def _grow(self, needed):
+        if self.map is not None:
+            self.map.close()
+        self.capacity = max(self.capacity + GROW_BYTES, needed)
+        self.file.truncate(self.capacity)
+        self.map = mmap.mmap(self.file.fileno(), self.capacity)
+
+    def write(self, frame, timestamp=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        frame = np.ascontiguousarray(frame)
+        keyframe = self.previous is None or self.frame_count % KEYFRAME_INTERVAL == 0
+        if keyframe:
+            payload = _compress(frame, self.codec)
+        else:
+            payload = _compress(np.bitwise_xor(frame, self.previous), self.codec)
+        self.previous = frame.copy()
+        self.frame_count += 1
+
+        end = self.offset + RECORD.size + len(payload)
+        if end > self.capacity:
+            self._grow(end)
+        RECORD.pack_into(self.map, self.offset, len(payload), FLAG_KEYFRAME if keyframe else 0, timestamp)
+        self.map[self.offset + RECORD.size:end] = payload
+        self.offset = end
+
+    def release(self):
+        if self.map is None:
+            return
+        self.map.flush()
+        self.map.close()
+        self.map = None
+        # Cut off the unused preallocated space
+        self.file.truncate(self.offset)
+        self.file.close()
+
+
+class SpoolReader:
+    """Iterates the frames of a spool file"""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, width, height, channels, self.fps, self.codec = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a spool file")
+        if self.codec == CODEC_LZ4 and lz4 is None:
+            raise RuntimeError("This spool was written with lz4, install the lz4 package to read it")
+        self.size = (width, height)
+        self.shape = (height, width, channels)
+
+    def records(self):
+        """Yield (flags, timestamp, payload offset, payload length) without decoding"""
+        offset = HEADER.size
+        while offset + RECORD.size <= len(self.map):
+            length, flags, timestamp = RECORD.unpack_from(self.map, offset)
+            offset += RECORD.size
+            if offset + length > len(self.map):
+                break
+            yield flags, timestamp, offset, length
+            offset += length
+
+    def __len__(self):
+        return sum(1 for _ in self.records())
+
+    def __iter__(self):
+        """Yield (timestamp, frame)"""
+        previous = None
+        for flags, timestamp, offset, length in self.records():
+            data = np.frombuffer(_decompress(self.map[offset:offset + length], self.codec),
+                                 dtype=np.uint8).reshape(self.shape)
+            if flags & FLAG_KEYFRAME:
+                frame = data
+            else:
+                frame = np.bitwise_xor(previous, data)
+            previous = frame
+            yield timestamp, frame
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def transcode_spool(spool_path, target, fourcc='mp4v', progress=None):
+    """Encode a spool into a regular video, keeping the captured timing"""
+    import cv2
+    reader = SpoolReader(spool_path)
+    try:
+        total = len(reader)
+        out = cv2.VideoWriter(target, cv2.VideoWriter_fourcc(*fourcc), reader.fps, reader.size)
+        start = None
+        written = 0
+        for index, (timestamp, frame) in enumerate(reader):
+            if start is None:
+                start = timestamp
+            # Repeat frames when capture fell behind so playback speed is right
+            target_count = max(written + 1, int(round((timestamp - start) * reader.fps)) + 1)
+            while written < target_count:
+                out.write(frame)
+                written += 1
+            if progress and total:
+                progress(index * 100 // total)
+        out.release()
+    finally:
+        reader.close()
+    if progress:
+        progress(100)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcode a recording spool to a video")
+    parser.add_argument("spool")
+    parser.add_argument("target")
+    parser.add_argument("--fourcc", default="mp4v")
+    args = parser.parse_args(argv)
+    transcode_spool(args.spool, args.target, args.fourcc)
+    print(f"Wrote {args.target} ({os.path.getsize(args.target) / 1024 / 1024:.1f} MiB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Lightweight tracing of the capture, edit and save lifecycle.
+
+Set SCREENSHOT_TRACE to a file path to record spans as Chrome trace events,
+viewable in chrome://tracing or https://ui.perfetto.dev:
+
+    SCREENSHOT_TRACE=trace.json python screenshot_app.py
+
+Events are appended to the file as they happen in the JSON array format,
+which the viewers accept without a closing bracket, so a trace survives a
+crash. Without the variable span() hands out one shared no-op context
+manager and the other functions return straight away.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import nullcontext
+
+TRACE_ENV = "SCREENSHOT_TRACE"
+
+_NULL_SPAN = nullcontext()
+
+
+def _now_us():
+    # The same clock as the perf_counter timestamps taken around captures
+    return time.perf_counter() * 1e6
+
+
+class Tracer:
+    """Appends trace events to a file from any thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.file = open(path, "w")
+        self.file.write("[\n")
+        self.named_threads = set()
+
+    def emit(self, event):
+        tid = threading.get_ident()
+        event["pid"] = self.pid
+        event["tid"] = tid
+        with self.lock:
+            if tid not in self.named_threads:
+                self.named_threads.add(tid)
+                self._write({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                             "args": {"name": threading.current_thread().name}})
+            self._write(event)
+
+    def _write(self, event):
+        self.file.write(json.dumps(event, separators=(",", ":"), default=str))
+        self.file.write(",\n")
+        self.file.flush()
+
+
+class Span:
+    """Records a complete event for the duration of a with block"""
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        event = {"name": self.name, "ph": "X", "ts": self.start, "dur": _now_us() - self.start}
+        if self.args:
+            event["args"] = self.args
+        self.tracer.emit(event)
+        return False
+
+
+def _create_tracer():
+    path = os.environ.get(TRACE_ENV)
+    if not path:
+        return None
+    try:
+        return Tracer(path)
+    except OSError as e:
+        print(f"Error opening trace file: {e}")
+        return None
+
+
+_tracer = _create_tracer()
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, **args):
+    """Context manager timing a block; errors raised in it are recorded"""
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, args)
+
+
+def complete(name, start, end=None, **args):
+    """Record a span measured elsewhere, from perf_counter() timestamps in seconds"""
+    if _tracer is None:
+        return
+    end = time.perf_counter() if end is None else end
+    event = {"name": name, "ph": "X", "ts": start * 1e6, "dur": (end - start) * 1e6}
+    if args:
+        event["args"] = args
+    _tracer.emit(event)
+
+
+def instant(name, **args):
+    """Record a point in time, e.g. an error"""
+    if _tracer is None:
+        return
+    event = {"name": name, "ph": "i", "s": "t", "ts": _now_us()}
+    if args:
+        event["args"] = args
+    _tracer.emit(event)
+
+
+def begin(name, span_id, **args):
+    """Start a span that ends in another call or thread, see end()"""
+    if _tracer is None:
+        return
+    event = {"name": name, "cat": name, "ph": "b", "id": span_id, "ts": _now_us()}
+    if args:
+        event["args"] = args
+    _tracer.emit(event)
+
+
+def end(name, span_id, **args):
+    if _tracer is None:
+        return
+    event = {"name": name, "cat": name, "ph": "e", "id": span_id, "ts": _now_us()}
+    if args:
+        event["args"] = args
+    _tracer.emit(event)
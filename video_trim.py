@@ -0,0 +1,227 @@
+import os
+import shutil
+import subprocess
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QPushButton,
+                             QCheckBox, QMessageBox)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+PREVIEW_WIDTH = 640
+
+
+def ffmpeg_path():
+    """Return the ffmpeg executable if it is installed"""
+    return shutil.which("ffmpeg")
+
+
+def video_info(path):
+    """Return (fps, frame_count, width, height) of a video"""
+    import cv2
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video {path}")
+    try:
+        return (capture.get(cv2.CAP_PROP_FPS) or 30.0,
+                int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+                int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    finally:
+        capture.release()
+
+
+def remux_video(source, target, start_frame, end_frame):
+    """Cut without re-encoding; cuts snap to the nearest keyframes"""
+    fps, _, _, _ = video_info(source)
+    subprocess.run([ffmpeg_path(), "-v", "error", "-y",
+                    "-ss", f"{start_frame / fps:.3f}", "-to", f"{end_frame / fps:.3f}",
+                    "-i", source, "-c", "copy", "-avoid_negative_ts", "make_zero", target],
+                   check=True, capture_output=True)
+
+
+def trim_video(source, target, start_frame, end_frame, progress=None):
+    """Copy frames [start_frame, end_frame) to a new file, one frame at a time"""
+    import cv2
+    fps, _, width, height = video_info(source)
+    capture = cv2.VideoCapture(source)
+    out = cv2.VideoWriter(target, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    try:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        total = max(1, end_frame - start_frame)
+        for i in range(end_frame - start_frame):
+            ok, frame = capture.read()
+            if not ok:
+                break
+            out.write(frame)
+            if progress and i % 10 == 0:
+                progress(i * 100 // total)
+    finally:
+        capture.release()
+        out.release()
+    if progress:
+        progress(100)
+
+
+class TrimWorker(QThread):
+    """Trims a recording off the UI thread"""
+    progress = pyqtSignal(int)
+    trimmed = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, source, start_frame, end_frame, remux=False, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.remux = remux
+
+    def run(self):
+        import tempfile
+        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as f:
+            target = f.name
+        try:
+            if self.remux:
+                remux_video(self.source, target, self.start_frame, self.end_frame)
+            else:
+                trim_video(self.source, target, self.start_frame, self.end_frame, self.progress.emit)
+            self.trimmed.emit(target)
+        except Exception as e:
+            print(f"Error trimming video: {e}")
+            if os.path.exists(target):
+                os.remove(target)
+            self.failed.emit(str(e))
+
+
+class TrimDialog(QDialog):
+    """Choose in and out points for a recording before saving it.
+
+    exec_() returns Discarded only for the Discard button; Esc or closing
+    the window rejects, which keeps the recording.
+    """
+    Discarded = 2
+
+    def __init__(self, video_file, parent=None):
+        super().__init__(parent)
+        import cv2
+        self.setWindowTitle("✂️ Trim Recording")
+        self.video_file = video_file
+        self.fps, self.frame_count, _, _ = video_info(video_file)
+        self.capture = cv2.VideoCapture(video_file)
+
+        layout = QVBoxLayout(self)
+
+        self.preview = QLabel()
+        self.preview.setAlignment(Qt.AlignCenter)
+        self.preview.setMinimumSize(PREVIEW_WIDTH, PREVIEW_WIDTH * 9 // 16)
+        layout.addWidget(self.preview)
+
+        # In and out point sliders
+        last_frame = max(0, self.frame_count - 1)
+        self.start_slider = QSlider(Qt.Horizontal)
+        self.start_slider.setRange(0, last_frame)
+        self.end_slider = QSlider(Qt.Horizontal)
+        self.end_slider.setRange(0, last_frame)
+        self.end_slider.setValue(last_frame)
+        self.range_label = QLabel()
+        for label, slider in (("In", self.start_slider), ("Out", self.end_slider)):
+            row = QHBoxLayout()
+            row.addWidget(QLabel(label))
+            row.addWidget(slider)
+            layout.addLayout(row)
+            slider.valueChanged.connect(self.slider_moved)
+        layout.addWidget(self.range_label)
+
+        # Remuxing needs ffmpeg and cuts on keyframes
+        self.fast_check = QCheckBox("Fast trim without re-encoding (cuts at nearest keyframe)")
+        self.fast_check.setEnabled(ffmpeg_path() is not None)
+        self.fast_check.setChecked(ffmpeg_path() is not None)
+        layout.addWidget(self.fast_check)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        discard_btn = QPushButton("🗑 Discard")
+        discard_btn.clicked.connect(self.discard)
+        buttons.addWidget(discard_btn)
+        save_btn = QPushButton("💾 Save")
+        save_btn.setDefault(True)
+        save_btn.clicked.connect(self.accept)
+        buttons.addWidget(save_btn)
+        layout.addLayout(buttons)
+
+        # Decode the preview only once the slider settles
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(50)
+        self.preview_timer.timeout.connect(self.update_preview)
+        self.preview_frame = 0
+
+        self.setStyleSheet("""
+            QDialog {
+                background: #1e1e1e;
+                color: white;
+            }
+            QLabel, QCheckBox {
+                color: white;
+                font-size: 13px;
+            }
+            QPushButton {
+                background: #3d3d3d;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                border-radius: 4px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background: #4d4d4d;
+            }
+        """)
+
+        self.slider_moved()
+        self.update_preview()
+
+    def discard(self):
+        reply = QMessageBox.question(self, "Discard Recording", "Delete this recording without saving it?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.done(self.Discarded)
+
+    def slider_moved(self):
+        # Keep the out point after the in point
+        if self.sender() is self.start_slider and self.end_slider.value() < self.start_slider.value():
+            self.end_slider.setValue(self.start_slider.value())
+        elif self.sender() is self.end_slider and self.start_slider.value() > self.end_slider.value():
+            self.start_slider.setValue(self.end_slider.value())
+        start, end = self.frame_range()
+        self.range_label.setText(f"{start / self.fps:.2f}s – {end / self.fps:.2f}s "
+                                 f"({(end - start) / self.fps:.2f}s of {self.frame_count / self.fps:.2f}s)")
+        self.preview_frame = self.sender().value() if isinstance(self.sender(), QSlider) else 0
+        self.preview_timer.start()
+
+    def update_preview(self):
+        import cv2
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, self.preview_frame)
+        ok, frame = self.capture.read()
+        if not ok:
+            return
+        height, width = frame.shape[:2]
+        frame = cv2.cvtColor(cv2.resize(frame, (PREVIEW_WIDTH, height * PREVIEW_WIDTH // width)),
+                             cv2.COLOR_BGR2RGB)
+        image = QImage(frame.data, frame.shape[1], frame.shape[0], frame.shape[1] * 3, QImage.Format_RGB888)
+        self.preview.setPixmap(QPixmap.fromImage(image))
+
+    def frame_range(self):
+        """Selected [start, end) frame range"""
+        return self.start_slider.value(), self.end_slider.value() + 1
+
+    def is_trimmed(self):
+        # Without a frame count, e.g. an mp4v file with no index, there is nothing to cut
+        if self.frame_count <= 0:
+            return False
+        return self.frame_range() != (0, self.frame_count)
+
+    def use_remux(self):
+        return self.fast_check.isChecked()
+
+    def done(self, result):
+        self.capture.release()
+        super().done(result)
@@ -0,0 +1,186 @@
+"""Watch a screen region and save a screenshot whenever it changes.
+
+Only the region is grabbed, a few times per second, so the cost follows
+its size rather than the monitor's. It is sampled through a strided view,
+compared against a slowly moving reference, and a capture is taken once
+enough of it changed and the change has settled. Captures
+are written on a background thread at full resolution. Between samples the
+watcher sleeps, and sources that report damage (see capture_backends) skip
+the comparison entirely while the screen is unchanged.
+
+    python watch_mode.py OUTPUT_DIR --region 100,100,800,600 --threshold 0.02
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from frame_source import create_frame_source
+
+DEFAULT_INTERVAL = 0.5
+DEFAULT_THRESHOLD = 0.01
+DEFAULT_DEBOUNCE = 2.0
+# Sample every Nth pixel in both directions
+SAMPLE_STEP = 8
+# Per-pixel difference of the channel sum that counts as changed
+PIXEL_DELTA = 24
+# How quickly the reference follows slow changes
+REFERENCE_RATE = 0.1
+
+
+class ChangeDetector:
+    """Decides from downsampled samples when a region has changed.
+
+    A sample is the channel sum of every SAMPLE_STEP-th pixel. The changed
+    fraction is measured against a reference that follows small changes
+    slowly, so gradual drift never triggers but a real change does. A
+    change fires once the region is stable again, or after debounce seconds
+    of continuous change, and never more often than once per debounce.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, debounce=DEFAULT_DEBOUNCE,
+                 step=SAMPLE_STEP, pixel_delta=PIXEL_DELTA):
+        self.threshold = threshold
+        self.debounce = debounce
+        self.step = step
+        self.pixel_delta = pixel_delta
+        self.reference = None
+        self.previous = None
+        self.change_started = None
+        self.last_capture = None
+
+    def sample(self, frame):
+        view = frame[::self.step, ::self.step, :3]
+        return view.sum(axis=2, dtype=np.int16)
+
+    def changed_fraction(self, sample, other):
+        return np.count_nonzero(np.abs(sample - other) > self.pixel_delta) / sample.size
+
+    def update(self, frame, now):
+        """Feed a frame, returns True when a capture should be taken"""
+        sample = self.sample(frame)
+        if self.reference is None:
+            self.reference = sample.astype(np.float32)
+            self.previous = sample
+            return False
+
+        changed = self.changed_fraction(sample, self.reference) > self.threshold
+        settled = self.changed_fraction(sample, self.previous) <= self.threshold
+        self.previous = sample
+        if not changed:
+            self.change_started = None
+            self.reference += REFERENCE_RATE * (sample - self.reference)
+            return False
+
+        if self.change_started is None:
+            self.change_started = now
+        if self.last_capture is not None and now - self.last_capture < self.debounce:
+            return False
+        if settled or now - self.change_started >= self.debounce:
+            self.last_capture = now
+            self.change_started = None
+            self.reference = sample.astype(np.float32)
+            return True
+        return False
+
+
+def save_capture(frame, directory):
+    """Write a BGRA frame as a timestamped PNG, returns the path"""
+    import cv2
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
+    path = os.path.join(directory, f"watch_{timestamp}.png")
+    if not cv2.imwrite(path, frame[:, :, :3]):
+        raise IOError(f"Could not write {path}")
+    return path
+
+
+class ScreenWatcher(QThread):
+    """Samples a region and saves a capture whenever it changes"""
+    captured = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, directory, region=None, interval=DEFAULT_INTERVAL, threshold=DEFAULT_THRESHOLD,
+                 debounce=DEFAULT_DEBOUNCE, source_factory=create_frame_source):
+        super().__init__()
+        self.directory = directory
+        # (x, y, width, height) in frame pixels, None for the whole frame
+        self.region = region
+        self.interval = interval
+        self.detector = ChangeDetector(threshold, debounce)
+        self.source_factory = source_factory
+        self.running = False
+
+    def grab(self, source):
+        if self.region is None:
+            return source.grab()
+        return source.grab_region(*self.region)
+
+    def run(self):
+        writer = ThreadPoolExecutor(max_workers=1)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with self.source_factory() as source:
+                self.running = True
+                next_time = time.perf_counter()
+                while self.running:
+                    frame = self.grab(source)
+                    # An empty damage list means nothing on screen changed
+                    if getattr(source, "damaged", None) != []:
+                        if self.detector.update(frame, time.monotonic()):
+                            # The frame is not reused, so the writer can keep the view
+                            writer.submit(self._save, frame)
+
+                    next_time += self.interval
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_time = time.perf_counter()
+        except Exception as e:
+            print(f"Error in watch mode: {e}")
+            self.failed.emit(str(e))
+        finally:
+            self.running = False
+            writer.shutdown(wait=True)
+
+    def _save(self, frame):
+        try:
+            self.captured.emit(save_capture(frame, self.directory))
+        except Exception as e:
+            print(f"Error saving watch capture: {e}")
+            self.failed.emit(str(e))
+
+    def stop(self):
+        self.running = False
+
+
+def main(argv=None):
+    from batch_process import parse_rect
+    parser = argparse.ArgumentParser(description="Save a screenshot whenever a screen region changes")
+    parser.add_argument("directory")
+    parser.add_argument("--region", type=parse_rect, metavar="X,Y,W,H")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="Seconds between samples")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Fraction of sampled pixels that must change")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help="Minimum seconds between captures")
+    parser.add_argument("--source", help="Frame source spec, see frame_source.create_frame_source")
+    args = parser.parse_args(argv)
+
+    watcher = ScreenWatcher(args.directory, args.region, args.interval, args.threshold, args.debounce,
+                            lambda: create_frame_source(args.source))
+    # There is no event loop here, so print straight from the writer thread
+    watcher.captured.connect(lambda path: print(f"Saved {path}"), Qt.DirectConnection)
+    print("Watching, press Ctrl+C to stop")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())